@@ -0,0 +1,177 @@
+import hashlib
+import json
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from sqlalchemy import tuple_
+
+from facets import facet_filters, cached_facets
+from http_cache import conditional, tables_version, venue_version, artist_version
+from matchmaking import venue_matches, artist_matches
+from models import Venue, Artist, Show
+from pagination import decode_cursor, paginate_request
+from replicas import read_replica
+from view_models import VENUES, ARTISTS, SHOWS, entity_item, listing_query, venue_shows, artist_shows
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Rows fetched per round trip from the server side cursor when streaming
+STREAM_BATCH_SIZE = 1000
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+
+def requested_fields():
+    # Fields selected with ?fields=id,name, or None for all fields
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def select_fields(item, fields):
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def wants_stream():
+    return (request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+
+def json_response(data):
+    # JSON response with an ETag of its body, answering 304 when it matches
+    body = json.dumps(data, default=str, separators=(',', ':'))
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    return response.make_conditional(request)
+
+
+def stream_listing(listing, fields):
+    # Stream every row after the request cursor as NDJSON, reading them in
+    # batches from a server side cursor instead of loading the whole table
+    direction, values = decode_cursor(request.args.get('cursor'), listing.columns)
+    if direction != 'next':
+        abort(400)
+
+    def generate():
+        # The query is made in the context of the stream, whose session is
+        # closed when the stream ends; the view's is closed before it starts
+        query = listing_query(listing, facet_filters(request.args))
+        if values is not None:
+            query = query.filter(tuple_(*listing.columns) > values)
+        query = query.order_by(*listing.columns).yield_per(STREAM_BATCH_SIZE)
+
+        for row in query:
+            yield json.dumps(select_fields(listing.item(row), fields), default=str) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def listing_response(listing):
+    fields = requested_fields()
+
+    if wants_stream():
+        return stream_listing(listing, fields)
+
+    # Same keyset pagination as the HTML listings
+    query = listing_query(listing, facet_filters(request.args))
+    page = paginate_request(query, listing.columns, listing.key)
+
+    data = {'data': [select_fields(listing.item(row), fields) for row in page.items]}
+    data.update(page.cursors())
+
+    return json_response(data)
+
+
+def detail_response(entity, upcoming_shows, past_shows):
+    data = entity_item(entity)
+    data.update({
+        'upcoming_shows': upcoming_shows,
+        'upcoming_shows_count': len(upcoming_shows),
+        'past_shows': past_shows,
+        'past_shows_count': len(past_shows),
+    })
+
+    return json_response(select_fields(data, requested_fields()))
+
+
+def matches_response(matches):
+    fields = requested_fields()
+    data = [select_fields(dict(match._mapping), fields) for match in matches]
+    return json_response({'data': data})
+
+#----------------------------------------------------------------------------#
+# Endpoints.
+#----------------------------------------------------------------------------#
+
+
+@api.route('/venues')
+@read_replica
+@conditional(lambda: tables_version(Venue))
+def venues():
+    return listing_response(VENUES)
+
+
+@api.route('/venues/facets')
+@read_replica
+def venue_facets():
+    return json_response(cached_facets('venues', Venue, facet_filters(request.args)))
+
+
+@api.route('/venues/<int:venue_id>')
+@read_replica
+@conditional(venue_version)
+def venue(venue_id):
+    data_venue = Venue.query.get_or_404(venue_id)
+    return detail_response(data_venue, *venue_shows(venue_id))
+
+
+@api.route('/venues/<int:venue_id>/recommendations')
+@read_replica
+def venue_recommendations(venue_id):
+    Venue.query.get_or_404(venue_id)
+    return matches_response(venue_matches(venue_id, current_app.config['MATCHES_LIMIT']))
+
+
+@api.route('/artists')
+@read_replica
+@conditional(lambda: tables_version(Artist))
+def artists():
+    return listing_response(ARTISTS)
+
+
+@api.route('/artists/facets')
+@read_replica
+def artist_facets():
+    return json_response(cached_facets('artists', Artist, facet_filters(request.args)))
+
+
+@api.route('/artists/<int:artist_id>')
+@read_replica
+@conditional(artist_version)
+def artist(artist_id):
+    data_artist = Artist.query.get_or_404(artist_id)
+    return detail_response(data_artist, *artist_shows(artist_id))
+
+
+@api.route('/artists/<int:artist_id>/recommendations')
+@read_replica
+def artist_recommendations(artist_id):
+    Artist.query.get_or_404(artist_id)
+    return matches_response(artist_matches(artist_id, current_app.config['MATCHES_LIMIT']))
+
+
+@api.route('/shows')
+@read_replica
+@conditional(lambda: tables_version(Show, Venue, Artist))
+def shows():
+    return listing_response(SHOWS)
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    return jsonify({'error': error.code, 'message': error.description}), error.code
@@ -3,21 +3,41 @@
 #----------------------------------------------------------------------------#
 
 import json
-from os import abort
 import sys
+from itertools import groupby
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort
 from flask_moment import Moment
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf.csrf import CSRFProtect
-import datetime
-from forms import VenueForm, ArtistForm, ShowForm
-from forms import *
+from datetime import datetime, timedelta
+from functools import lru_cache
+from forms import VenueForm, ArtistForm, ShowForm, ShowBatchForm
 from models import db, Venue, Artist, Show
+from pagination import paginate_request
+from view_models import VENUES, ARTISTS, SHOWS, listing_query, venue_shows, artist_shows
+from facets import facet_filters, filters_key, cached_facets
+from counters import add_upcoming_show, remove_venue_upcoming_shows
+from tasks import enqueue_thumbnails, enqueue_matches_refresh, enqueue_counters_refresh
+from jobs import queue_stats
+from scheduling import BATCH_MAX_SHOWS, find_conflicts, is_double_booking, validate_show_batch, book_shows
+from importer import read_show_lines
+from availability import find_available_venues
+from matchmaking import venue_matches, artist_matches
+from commands import counters_cli, matches_cli, assets_cli, jobs_cli, import_command, export_command
+from cache import cache
+from assets import assets
+from thumbnails import thumbnails
+from pool import pool_stats, statement_timeout
+from replicas import replica_router, read_replica
+from http_cache import conditional, tables_version, venue_version, artist_version, version_key
+from queries import query_log
+from api import api
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -31,25 +51,75 @@ app.config.from_object('config')
 
 # TODO: connect to a local postgresql database
 
+pool_stats.init_app(app)
+replica_router.init_app(app)
 db.init_app(app)
+statement_timeout.init_app(app)
+assets.init_app(app)
+thumbnails.init_app(app)
 migrate = Migrate(app, db)
+cache.init_app(app)
+query_log.init_app(app)
+
+app.cli.add_command(counters_cli)
+app.cli.add_command(matches_cli)
+app.cli.add_command(assets_cli)
+app.cli.add_command(jobs_cli)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+app.register_blueprint(api)
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 
+# Locale and patterns of the datetime filter. The site's full and medium
+# formats, and any other pattern, are parsed once instead of on every show
+# tile; Babel's short and long formats of the locale are left to Babel.
+DATETIME_LOCALE = babel.Locale.parse('en')
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+BABEL_DATETIME_FORMATS = ('short', 'long')
+
+
+@lru_cache(maxsize=64)
+def datetime_pattern(format):
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+
+
 def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+    # View models pass datetimes; strings are still parsed for other callers
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    if format in BABEL_DATETIME_FORMATS:
+        return babel.dates.format_datetime(value, format, locale=DATETIME_LOCALE)
+    return datetime_pattern(format).apply(value, DATETIME_LOCALE)
 
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+
+def search_pattern(search_term):
+    # Escape LIKE wildcards so the term is matched literally anywhere in the name
+    escaped = search_term.replace('\\', '\\\\').replace(
+        '%', '\\%').replace('_', '\\_')
+    return '%{}%'.format(escaped)
+
+
+def listing_cache_key():
+    # Cache key of a listing page, from the version of its tables and the
+    # paging and facet arguments of the request
+    return 'page:{}:{}:{}:{}'.format(version_key(), request.args.get('cursor', ''),
+                                     request.args.get('limit', ''),
+                                     filters_key(facet_filters(request.args)))
+
 #----------------------------------------------------------------------------#
 # Controllers
 #----------------------------------------------------------------------------#
@@ -63,142 +133,94 @@ def index():
 #  ----------------------------------------------------------------
 
 
-@app.route('/venues')
-def venues():
+def load_venues():
     # TODO: replace with real venues data.
     #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
     data_areas = []
 
-    # Get areas
-    areas = Venue.query.with_entities(
-        Venue.city, Venue.state).group_by(Venue.city, Venue.state).all()
-
-    # Iterate over each area
-    for area in areas:
-        data_venues = []
-
-        # Get venues by area
-        venues = Venue.query.filter_by(
-            state=area.state).filter_by(city=area.city).all()
-
-        # Iterate over each venue
-        for venue in venues:
-            # Get upcoming shows by venue
-            upcoming_shows = db.session.query(Show).filter(
-                Show.venue_id == venue.id).filter(Show.start_time > datetime.now()).all()
-
-            # Map venues
-            data_venues.append({
-                'id': venue.id,
-                'name': venue.name,
-                'num_upcoming_shows': len(upcoming_shows)
-            })
+    # Get a page of venues with their upcoming shows count, ordered by area
+    query = listing_query(VENUES, facet_filters(request.args))
+    page = paginate_request(query, VENUES.columns, VENUES.key)
 
+    # Group venues by area
+    for (city, state), area_venues in groupby(page.items, key=lambda venue: (venue.city, venue.state)):
         # Map areas
         data_areas.append({
-            'city': area.city,
-            'state': area.state,
-            'venues': data_venues
+            'city': city,
+            'state': state,
+            'venues': [VENUES.item(venue) for venue in area_venues]
         })
 
-    return render_template('pages/venues.html', areas=data_areas)
+    return {'areas': data_areas, 'page': page.cursors()}
+
+
+@app.route('/venues')
+@read_replica
+@conditional(lambda: tables_version(Venue))
+def venues():
+    filters = facet_filters(request.args)
+    data = cache.get_or_set('venues', listing_cache_key(), load_venues)
+    facets = cached_facets('venues', Venue, filters)
+    return render_template('pages/venues.html', filters=filters, facets=facets, **data)
 
 
 @app.route('/venues/search', methods=['POST'])
+@read_replica
 def search_venues():
     # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
 
     # Prepare search data
-    search_term = request.form['search_term']
-    search = "%{}%".format(search_term)
-
-    # Get venues
-    venues = Venue.query.with_entities(
-        Venue.id, Venue.name).filter(Venue.name.match(search)).all()
-
-    # Iterate over each venue
-    data_venues = []
-
-    for venue in venues:
-        # Get upcoming shows by venue
-        upcoming_shows = db.session.query(Show).filter(
-            Show.venue_id == venue.id).filter(Show.start_time > datetime.now()).all()
-
-        # Map venues
-        data_venues.append({
-            'id': venue.id,
-            'name': venue.name,
-            'num_upcoming_shows': len(upcoming_shows)
-        })
+    search_term = request.form['search_term'].strip()
+    search = search_pattern(search_term)
+
+    # Get matching venues ranked by trigram similarity, with their upcoming shows count
+    venues = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.num_upcoming_shows
+    ).filter(Venue.name.ilike(search, escape='\\')).order_by(
+        db.func.similarity(Venue.name, search_term).desc(), Venue.name).limit(
+        app.config['SEARCH_RESULTS_LIMIT']).all()
+
+    # Map venues
+    data_venues = [{
+        'id': venue.id,
+        'name': venue.name,
+        'num_upcoming_shows': venue.num_upcoming_shows
+    } for venue in venues]
 
     # Map results
     results = {
-        'venues': data_venues,
-        'count': len(venues)
+        'data': data_venues,
+        'count': len(data_venues)
     }
 
     return render_template('pages/search_venues.html', results=results, search_term=search_term)
 
 
 @app.route('/venues/<int:venue_id>')
+@read_replica
+@conditional(venue_version)
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     # TODO: replace with real venue data from the venues table, using venue_id
 
     # Get venue
-    data_venue = Venue.query.filter(Venue.id == venue_id).first()
-
-    # Get the upcoming shows of this venue
-    upcoming_shows_query = db.session.query(Show).join(Venue).filter(
-        Show.venue_id == venue_id).filter(Show.start_time > datetime.now()).all()
-
-    if len(upcoming_shows_query) > 0:
-        # data_upcoming_shows = []
-
-        upcoming_shows = []
-
-        for show in upcoming_shows_query:
-
-            artist = Artist.query.filter(
-                Artist.id == show.artist_id).first()
+    data_venue = Venue.query.get_or_404(venue_id)
 
-            upcoming_shows.append({
-                'artist_id': artist.id,
-                'artist_name': artist.name,
-                'artist_image_link': artist.image_link,
-                'start_time': str(show.start_time),
-            })
+    # Get all shows of this venue together with their artists
+    upcoming_shows, past_shows = venue_shows(venue_id)
 
-        # Add shows data
-        data_venue.upcoming_shows = upcoming_shows
-        data_venue.upcoming_shows_count = len(upcoming_shows)
+    # Add shows data
+    data_venue.upcoming_shows = upcoming_shows
+    data_venue.upcoming_shows_count = len(upcoming_shows)
+    data_venue.past_shows = past_shows
+    data_venue.past_shows_count = len(past_shows)
 
-    # Get the past shows of this venue
-    past_shows_query = db.session.query(Show).join(Show.venues).filter(
-        Show.venue_id == int(venue_id)).filter(Show.start_time < datetime.now()).all()
-
-    if len(past_shows_query) > 0:
-
-        past_shows = []
-
-        # Iterate over each past show
-        for show in past_shows_query:
-
-            artist = Artist.query.filter(Artist.id == show.artist_id).first()
-
-            # Map past shows
-            past_shows.append({
-                'artist_id': artist.id,
-                'artist_name': artist.name,
-                'artist_image_link': artist.image_link,
-                'start_time': str(show.start_time),
-            })
-
-        # Add shows data
-        data_venue.past_shows = past_shows
-        data_venue.past_shows_count = len(past_shows)
+    # Get recommended artists
+    data_venue.matches = venue_matches(venue_id, app.config['MATCHES_LIMIT'])
 
     return render_template('pages/show_venue.html', venue=data_venue)
 
@@ -253,7 +275,12 @@ def create_venue_submission():
 
             # Update DB
             db.session.add(venue)
+
+            # Derived work, run by the job workers once committed
+            enqueue_thumbnails(image_link)
+            enqueue_matches_refresh()
             db.session.commit()
+            cache.invalidate('venues')
 
         except Exception:
             error = True
@@ -272,7 +299,7 @@ def create_venue_submission():
                 + ' could not be listed.',
                 'danger'
             )
-            abort()
+            abort(500)
 
         # on successful db insert, flash success
         if not error:
@@ -302,8 +329,14 @@ def delete_venue(venue_id):
     error = False
 
     try:
+        # Delete the shows of the venue and take them off the artists' counters
+        remove_venue_upcoming_shows(int(venue_id))
+        Show.query.filter_by(venue_id=int(venue_id)).delete()
+
         Venue.query.filter_by(id=int(venue_id)).delete()
+        enqueue_matches_refresh()
         db.session.commit()
+        cache.invalidate('venues', 'artists', 'shows')
     except Exception as e:
         error = True
         db.session.rollback()
@@ -318,7 +351,7 @@ def delete_venue(venue_id):
             'An error occurred. Venue could not be deleted.',
             'danger'
         )
-        abort()
+        abort(500)
 
     if not error:
         flash(
@@ -332,124 +365,131 @@ def delete_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route('/artists')
-def artists():
+def load_artists():
     # TODO: replace with real data returned from querying the database
 
-    data_artists = []
+    # Get a page of artists with their upcoming shows count
+    query = listing_query(ARTISTS, facet_filters(request.args))
+    page = paginate_request(query, ARTISTS.columns, ARTISTS.key)
 
-    # Get artists
-    artists = Artist.query.with_entities(
-        Artist.id, Artist.name).order_by('id').all()
+    # Map artists
+    data_artists = [ARTISTS.item(artist) for artist in page.items]
 
-    # Iterate over each artist
-    for artist in artists:
-        # Get upcoming shows
-        upcoming_shows = db.session.query(Show).filter(
-            Show.artist_id == artist.id).filter(Show.start_time > datetime.now()).all()
+    return {'artists': data_artists, 'page': page.cursors()}
 
-        # Map artists
-        data_artists.append({
-            'id': artist.id,
-            'name': artist.name,
-            'num_upcoming_shows': len(upcoming_shows)
-        })
 
-    return render_template('pages/artists.html', artists=data_artists)
+@app.route('/artists')
+@read_replica
+@conditional(lambda: tables_version(Artist))
+def artists():
+    filters = facet_filters(request.args)
+    data = cache.get_or_set('artists', listing_cache_key(), load_artists)
+    facets = cached_facets('artists', Artist, filters)
+    return render_template('pages/artists.html', filters=filters, facets=facets, **data)
 
 
 @app.route('/artists/search', methods=['POST'])
+@read_replica
 def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
 
     # Prepare search data
-    search_term = request.form['search_term']
-
-    search = "%{}%".format(search_term)
-
-    # Get artists
-    artists = Artist.query.with_entities(
-        Artist.id, Artist.name).filter(Artist.name.match(search)).all()
+    search_term = request.form['search_term'].strip()
+    search = search_pattern(search_term)
 
-    # Iterate over each artist
-    data_artists = []
-
-    for artist in artists:
-        # Get upcoming shows
-        upcoming_shows = db.session.query(Show).filter(
-            Show.artist_id == artist.id).filter(Show.start_time > datetime.now()).all()
-
-        # Map artists
-        data_artists.append({'id': artist.id, 'name': artist.name,
-                            'num_upcoming_shows': len(upcoming_shows)})
+    # Get matching artists ranked by trigram similarity, with their upcoming shows count
+    artists = db.session.query(
+        Artist.id,
+        Artist.name,
+        Artist.num_upcoming_shows
+    ).filter(Artist.name.ilike(search, escape='\\')).order_by(
+        db.func.similarity(Artist.name, search_term).desc(), Artist.name).limit(
+        app.config['SEARCH_RESULTS_LIMIT']).all()
+
+    # Map artists
+    data_artists = [{
+        'id': artist.id,
+        'name': artist.name,
+        'num_upcoming_shows': artist.num_upcoming_shows
+    } for artist in artists]
 
     # Map data
-    results = {'data': data_artists, 'count': len(artists)}
+    results = {'data': data_artists, 'count': len(data_artists)}
 
     return render_template('pages/search_artists.html', results=results, search_term=search_term)
 
 
 @app.route('/artists/<int:artist_id>')
+@read_replica
+@conditional(artist_version)
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
     # TODO: replace with real artist data from the artist table, using artist_id
 
     # Get artist
-    data_artist = Artist.query.filter(Artist.id == artist_id).first()
-
-    # Get the upcoming shows of this artist
-    upcoming_shows_query = db.session.query(Show).join(Artist).filter(
-        Show.artist_id == artist_id).filter(Show.start_time < datetime.now()).all()
-
-    if len(upcoming_shows_query) > 0:
-
-        upcoming_shows = []
-
-        # Iterate over each upcoming show
-        for show in upcoming_shows_query:
+    data_artist = Artist.query.get_or_404(artist_id)
 
-            venue = Venue.query.filter(Venue.id == show.venue_id).first()
+    # Get all shows of this artist together with their venues
+    upcoming_shows, past_shows = artist_shows(artist_id)
 
-            # Map upcoming shows
-            upcoming_shows.append({
-                'venue_id': venue.id,
-                'venue_name': venue.name,
-                'venue_image_link': venue.image_link,
-                'start_time': str(show.start_time),
-            })
+    # Add shows data
+    data_artist.upcoming_shows = upcoming_shows
+    data_artist.upcoming_shows_count = len(upcoming_shows)
+    data_artist.past_shows = past_shows
+    data_artist.past_shows_count = len(past_shows)
 
-        # Add shows data
-        data_artist.upcoming_shows = upcoming_shows
-        data_artist.upcoming_shows_count = len(upcoming_shows)
+    # Get recommended venues
+    data_artist.matches = artist_matches(artist_id, app.config['MATCHES_LIMIT'])
 
-        # Get the past shows of this venue
-        past_shows_query = db.session.query(Show).join(Artist).filter(
-            Show.artist_id == artist_id).filter(Show.start_time < datetime.now()).all()
-
-        if len(past_shows_query) > 0:
-
-            past_shows = []
+    return render_template('pages/show_artist.html', artist=data_artist)
 
-            # Iterate over each past show
-            for show in past_shows_query:
 
-                venue = Venue.query.filter(Venue.id == show.venue_id).first()
+@app.route('/artists/<int:artist_id>/availability')
+@read_replica
+def artist_availability(artist_id):
+    # venues seeking talent with evenings free for the artist in a date window
 
-                # Map past shows
-                past_shows.append({
-                    'venue_id': venue.id,
-                    'venue_name': venue.name,
-                    'venue_image_link': venue.image_link,
-                    'start_time': str(show.start_time),
-                })
+    # Get artist
+    artist = Artist.query.get_or_404(artist_id)
 
-            # Add shows data
-            data_artist.past_shows = past_shows
-            data_artist.past_shows_count = len(past_shows)
+    # Prepare search data, defaulting to the artist's city over the next days
+    city = request.args.get('city') or artist.city
+    state = request.args.get('state') or artist.state
+    max_days = app.config['AVAILABILITY_MAX_DAYS']
 
-    return render_template('pages/show_artist.html', artist=data_artist)
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() \
+            if request.args.get('start') else datetime.now().date()
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() \
+            if request.args.get('end') else start + timedelta(days=max_days - 1)
+    except ValueError:
+        flash('Dates must be formatted as YYYY-MM-DD.', 'danger')
+        start = datetime.now().date()
+        end = start + timedelta(days=max_days - 1)
+
+    if end < start or (end - start).days >= max_days:
+        flash('Dates must span 1 to ' + str(max_days) + ' days.', 'danger')
+        end = start + timedelta(days=max_days - 1)
+
+    # Get available venues
+    venues = find_available_venues(
+        artist, start, end, city, state,
+        evening_start=app.config['AVAILABILITY_EVENING_START'],
+        evening_hours=app.config['AVAILABILITY_EVENING_HOURS'],
+        limit=app.config['SEARCH_RESULTS_LIMIT'])
+
+    # Map venues
+    data_venues = [{
+        'id': venue.id,
+        'name': venue.name,
+        'genre_overlap': venue.genre_overlap,
+        'free_evenings': venue.free_evenings,
+    } for venue in venues]
+
+    return render_template('pages/availability.html', artist=artist, venues=data_venues,
+                           city=city, state=state, start=start, end=end)
 
 
 #  Update
@@ -519,8 +559,13 @@ def edit_artist_submission(artist_id):
             artist.seeking_venue = seeking_venue
             artist.seeking_description = seeking_description
 
+            # Derived work, run by the job workers once committed
+            enqueue_thumbnails(image_link)
+            enqueue_matches_refresh()
+
             # Update DB
             db.session.commit()
+            cache.invalidate('artists', 'shows')
         except Exception:
             error = True
             db.session.rollback()
@@ -535,7 +580,7 @@ def edit_artist_submission(artist_id):
                 + ' could not be updated.',
                 'danger'
             )
-            abort()
+            abort(500)
 
         if not error:
             flash(
@@ -618,8 +663,13 @@ def edit_venue_submission(venue_id):
             venue.seeking_talent = seeking_talent
             venue.seeking_description = seeking_description
 
+            # Derived work, run by the job workers once committed
+            enqueue_thumbnails(image_link)
+            enqueue_matches_refresh()
+
             # Update DB
             db.session.commit()
+            cache.invalidate('venues', 'shows')
         except Exception:
             error = True
             db.session.rollback()
@@ -700,7 +750,12 @@ def create_artist_submission():
 
             # Update DB
             db.session.add(artist)
+
+            # Derived work, run by the job workers once committed
+            enqueue_thumbnails(image_link)
+            enqueue_matches_refresh()
             db.session.commit()
+            cache.invalidate('artists')
         except Exception:
             error = True
             db.session.rollback()
@@ -730,7 +785,7 @@ def create_artist_submission():
                 + ' could not be listed.',
                 'danger'
             )
-            abort()
+            abort(500)
 
         return render_template('pages/home.html')
 
@@ -743,35 +798,25 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
-def shows():
+def load_shows():
     # displays list of shows at /shows
     # TODO: replace with real venues data.
 
-    show_data = []
-
-    # Get data
-    shows = db.session.query(
-        Venue.name,
-        Artist.name,
-        Artist.image_link,
-        Show.venue_id,
-        Show.artist_id,
-        Show.start_time
-    ).filter(Venue.id == Show.venue_id, Artist.id == Show.artist_id)
+    # Get a page of shows ordered by start time
+    page = paginate_request(SHOWS.query(), SHOWS.columns, SHOWS.key)
 
     # Map data
-    for show in shows:
-        show_data.append({
-            'venue_name': show[0],
-            'artist_name': show[1],
-            'artist_image_link': show[2],
-            'venue_id': show[3],
-            'artist_id': show[4],
-            'start_time': str(show[5])
-        })
+    show_data = [SHOWS.item(show) for show in page.items]
 
-    return render_template('pages/shows.html', shows=show_data)
+    return {'shows': show_data, 'page': page.cursors()}
+
+
+@app.route('/shows')
+@read_replica
+@conditional(lambda: tables_version(Show, Venue, Artist))
+def shows():
+    data = cache.get_or_set('shows', listing_cache_key(), load_shows)
+    return render_template('pages/shows.html', **data)
 
 
 @app.route('/shows/create')
@@ -793,9 +838,24 @@ def create_show_submission():
         error = False
 
         # Get data
-        artist_id = request.form['artist_id']
-        venue_id = request.form['venue_id']
-        start_time = request.form['start_time']
+        artist_id = form.artist_id.data
+        venue_id = form.venue_id.data
+        start_time = form.start_time.data
+        duration = form.duration.data
+
+        # Refuse double bookings of the venue or the artist
+        conflicts = find_conflicts(venue_id, artist_id, start_time, duration)
+        if conflicts:
+            for conflict in conflicts:
+                flash(
+                    'The venue or the artist is already booked for show '
+                    + str(conflict.id)
+                    + ' at '
+                    + str(conflict.start_time)
+                    + '.',
+                    'danger'
+                )
+            return render_template('forms/new_show.html', form=form)
 
         try:
             # Create model
@@ -803,11 +863,31 @@ def create_show_submission():
                 artist_id=artist_id,
                 venue_id=venue_id,
                 start_time=start_time,
+                duration=duration,
             )
 
+            # Count the show as upcoming for its venue and artist
+            if start_time > datetime.now():
+                add_upcoming_show(venue_id, artist_id)
+
             # Update DB
             db.session.add(show)
+
+            # Recount when the show turns past
+            enqueue_counters_refresh(start_time)
             db.session.commit()
+            cache.invalidate('shows', 'venues', 'artists')
+        except IntegrityError as e:
+            error = True
+            db.session.rollback()
+            print(sys.exc_info())
+            # Booked meanwhile by another request
+            if is_double_booking(e):
+                flash(
+                    'The venue or the artist was booked at that time meanwhile.',
+                    'danger'
+                )
+                return render_template('forms/new_show.html', form=form)
         except Exception:
             error = True
             db.session.rollback()
@@ -831,7 +911,7 @@ def create_show_submission():
                 'An error occurred. Show could not be listed.',
                 'danger'
             )
-            abort()
+            abort(500)
 
         return render_template('pages/home.html')
 
@@ -841,6 +921,102 @@ def create_show_submission():
     return render_template('forms/new_show.html', form=form)
 
 
+@app.route('/shows/create/batch')
+def create_show_batch():
+    form = ShowBatchForm()
+    return render_template('forms/new_show_batch.html', form=form)
+
+
+@app.route('/shows/create/batch', methods=['POST'])
+def create_show_batch_submission():
+    # Create many shows at once, all or none: every line is checked against
+    # the form rules, the artists and venues, the other lines and the booked
+    # shows, and the errors of each line are listed
+    form = ShowBatchForm()
+
+    if not form.validate_on_submit():
+        for field, message in form.errors.items():
+            flash(field + ' - ' + str(message), 'danger')
+        return render_template('forms/new_show_batch.html', form=form)
+
+    rows = list(read_show_lines(form.shows.data))
+    if not rows or len(rows) > BATCH_MAX_SHOWS:
+        flash(
+            'A batch must hold between 1 and '
+            + str(BATCH_MAX_SHOWS)
+            + ' shows.',
+            'danger'
+        )
+        return render_template('forms/new_show_batch.html', form=form)
+
+    shows, errors = validate_show_batch(rows)
+
+    if not errors:
+        try:
+            book_shows(shows)
+
+            # Recount when the shows turn past
+            enqueue_counters_refresh(*[values['start_time'] for line_num, values in shows])
+
+            # Update DB
+            db.session.commit()
+            cache.invalidate('shows', 'venues', 'artists')
+        except Exception as e:
+            # e.g. a show booked meanwhile by someone else
+            db.session.rollback()
+            print(sys.exc_info())
+            errors = {0: {'batch': [str(getattr(e, 'orig', e))]}}
+        finally:
+            db.session.close()
+
+    # Show banner
+    if errors:
+        flash(
+            'An error occurred. None of the '
+            + str(len(rows))
+            + ' shows could be listed.',
+            'danger'
+        )
+        return render_template('forms/new_show_batch.html', form=form,
+                               errors=sorted(errors.items()))
+
+    flash(
+        str(len(shows))
+        + ' shows were successfully listed!',
+        'success'
+    )
+    return render_template('pages/home.html')
+
+
+#  Admin
+#  ----------------------------------------------------------------
+
+
+@app.route('/admin/cache')
+def cache_stats():
+    # Hit, miss and invalidation counters of the listings cache in this worker
+    return jsonify(cache.stats())
+
+
+@app.route('/admin/pool')
+def pool_stats_view():
+    # Checkout latency, usage and timeouts of the database pools of this
+    # worker, the primary's and each replica's
+    return jsonify(pool_stats.stats(db.engines))
+
+
+@app.route('/admin/replicas')
+def replica_stats():
+    # Health and lag of the read replicas, as last checked by this worker
+    return jsonify(replica_router.stats())
+
+
+@app.route('/admin/jobs')
+def job_stats():
+    # Job counts of each queue by status, and how late its oldest due job is
+    return jsonify(queue_stats())
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -0,0 +1,247 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+# Bundles built by `flask assets build`, with their source files under
+# static/ in load order. Built files go to static/dist/, a sibling of css/,
+# so relative url()s in the stylesheets still resolve.
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    'main.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+    'respond.js': [
+        'js/libs/respond-1.4.2.min.js',
+    ],
+}
+
+# Images resized to each width and converted to each format
+IMAGES = {
+    'img/front-splash.jpg': (480, 960, 1440),
+}
+IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+
+DIST_DIRECTORY = 'dist'
+MANIFEST_FILE = 'manifest.json'
+
+# Built files never change under the same name
+DIST_MAX_AGE = 365 * 24 * 60 * 60
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+
+def minify(name, text):
+    # Minify with rcssmin/rjsmin when installed; most sources are already
+    # minified, so the bundles are still usable without them
+    try:
+        if name.endswith('.css'):
+            import rcssmin
+            return rcssmin.cssmin(text)
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        return text
+
+
+def fingerprinted(name, data):
+    # main.css -> main.<hash>.css
+    base, extension = os.path.splitext(name)
+    return '{}.{}{}'.format(base, hashlib.sha256(data).hexdigest()[:12], extension)
+
+
+def write_compressed(path, data):
+    # gzip and, with the brotli package, brotli variants served to clients
+    # accepting them. Returns the notes of skipped variants.
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    try:
+        import brotli
+    except ImportError:
+        return ['brotli is not installed, .br variants skipped']
+
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+    return []
+
+
+def build_bundles(static_folder, dist_folder):
+    files = {}
+    notes = []
+
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                parts.append(minify(name, f.read()))
+
+        # Scripts are separated so one without a final semicolon can not
+        # run into the next
+        separator = '\n' if name.endswith('.css') else ';\n'
+        data = separator.join(parts).encode('utf-8')
+
+        filename = fingerprinted(name, data)
+        with open(os.path.join(dist_folder, filename), 'wb') as f:
+            f.write(data)
+        notes.extend(write_compressed(os.path.join(dist_folder, filename), data))
+        files[name] = filename
+
+    return files, notes
+
+
+def build_images(static_folder, dist_folder):
+    # Resized variants of each image in each format Pillow can write, as
+    # {image: {format: [[width, filename], ...]}}
+    try:
+        from PIL import Image
+    except ImportError:
+        return {}, ['Pillow is not installed, images skipped']
+
+    images = {}
+    notes = []
+
+    for name, widths in IMAGES.items():
+        source = Image.open(os.path.join(static_folder, name))
+        base = os.path.splitext(name)[0]
+        images[name] = {}
+
+        for format in IMAGE_FORMATS:
+            variants = []
+            for width in widths:
+                if width > source.width:
+                    continue
+                height = round(source.height * width / source.width)
+                image = source.convert('RGB').resize((width, height), Image.LANCZOS)
+                path = os.path.join(dist_folder, '{}-{}.{}'.format(os.path.basename(base), width, format))
+                try:
+                    image.save(path, format=format.upper(), quality=80)
+                except (KeyError, OSError):
+                    if os.path.exists(path):
+                        os.remove(path)
+                    notes.append('Pillow can not write {}, skipped'.format(format))
+                    break
+                with open(path, 'rb') as f:
+                    filename = fingerprinted(os.path.basename(path), f.read())
+                os.replace(path, os.path.join(dist_folder, filename))
+                variants.append([width, filename])
+            if variants:
+                images[name][format] = variants
+
+    return images, list(dict.fromkeys(notes))
+
+
+def build_assets(static_folder):
+    # Rebuild static/dist/ and its manifest. Returns (manifest, notes).
+    dist_folder = os.path.join(static_folder, DIST_DIRECTORY)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+    os.makedirs(dist_folder)
+
+    files, bundle_notes = build_bundles(static_folder, dist_folder)
+    images, image_notes = build_images(static_folder, dist_folder)
+    manifest = {'files': files, 'images': images}
+
+    with open(os.path.join(dist_folder, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest, list(dict.fromkeys(bundle_notes)) + image_notes
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+
+class Assets(object):
+    # Template helpers resolving bundles and images to their built files
+    # from the manifest, or to their sources when nothing was built, and the
+    # view serving the built files with far-future caching.
+
+    def __init__(self, app=None):
+        self.dist_folder = None
+        self.manifest = {'files': {}, 'images': {}}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_folder = os.path.join(app.static_folder, DIST_DIRECTORY)
+
+        path = os.path.join(self.dist_folder, MANIFEST_FILE)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+        app.add_url_rule('/static/dist/<path:filename>', 'dist', self.send_dist)
+        app.jinja_env.globals.update(
+            asset_urls=self.asset_urls,
+            image_url=self.image_url,
+            image_srcset=self.image_srcset,
+        )
+
+    def dist_url(self, filename):
+        return url_for('dist', filename=filename)
+
+    def asset_urls(self, name):
+        # URL of the built bundle, or of each of its sources
+        if name in self.manifest['files']:
+            return [self.dist_url(self.manifest['files'][name])]
+        return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+    def image_url(self, name):
+        # Largest JPEG variant of an image, or the original
+        variants = self.manifest['images'].get(name, {}).get('jpeg')
+        if variants:
+            return self.dist_url(variants[-1][1])
+        return url_for('static', filename=name)
+
+    def image_srcset(self, name, format):
+        variants = self.manifest['images'].get(name, {}).get(format, [])
+        return ', '.join('{} {}w'.format(self.dist_url(filename), width)
+                         for width, filename in variants)
+
+    def send_dist(self, filename):
+        # The manifest is rewritten by each build under the same name, so it
+        # is revalidated like any static file
+        if filename == MANIFEST_FILE:
+            return send_from_directory(self.dist_folder, filename)
+
+        # Serve the brotli or gzip variant when the client accepts it
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = None
+        path = filename
+
+        for accepted, extension in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[accepted] and os.path.exists(
+                    os.path.join(self.dist_folder, filename + extension)):
+                encoding = accepted
+                path = filename + extension
+                break
+
+        response = send_from_directory(self.dist_folder, path, mimetype=mimetype, max_age=DIST_MAX_AGE)
+        if encoding is not None:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+assets = Assets()
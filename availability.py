@@ -0,0 +1,69 @@
+from datetime import time, timedelta
+
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Venue availability.
+#----------------------------------------------------------------------------#
+
+# Evenings of the window are built with generate_series, and an evening is
+# free for a venue when no show of the venue nor of the artist overlaps it.
+# Both NOT EXISTS probes use the GiST indexes of the shows exclusion
+# constraints, so the whole search is one set based query.
+AVAILABILITY_QUERY = db.text("""
+    WITH evenings AS (
+        SELECT tsrange(day + :evening_start, day + :evening_end) AS slot
+        FROM generate_series(CAST(:start AS timestamp), CAST(:end AS timestamp),
+                             interval '1 day') AS day
+    )
+    SELECT venues.id,
+           venues.name,
+           venues.city,
+           venues.state,
+           cardinality(ARRAY(
+               SELECT unnest(venues.genre_ids)
+               INTERSECT
+               SELECT unnest(:genre_ids)
+           )) AS genre_overlap,
+           array_agg(lower(evenings.slot) ORDER BY evenings.slot) AS free_evenings
+    FROM venues
+    CROSS JOIN evenings
+    WHERE venues.seeking_talent
+      AND lower(venues.city) = lower(:city)
+      AND venues.state = :state
+      AND venues.genre_ids && :genre_ids
+      AND NOT EXISTS (
+          SELECT 1 FROM shows
+          WHERE shows.venue_id = venues.id AND shows.during && evenings.slot
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM shows
+          WHERE shows.artist_id = :artist_id AND shows.during && evenings.slot
+      )
+    GROUP BY venues.id
+    ORDER BY genre_overlap DESC, count(*) DESC, venues.name
+    LIMIT :limit
+""").bindparams(bindparam('genre_ids', type_=ARRAY(db.SmallInteger)))
+
+
+def find_available_venues(artist, start, end, city, state, evening_start=time(19),
+                          evening_hours=4, limit=50):
+    # Venues seeking talent in the city with a genre of the artist and at
+    # least one evening between the start and end dates free for both, ranked
+    # by the number of shared genres and then by the number of free evenings
+    evening_start = timedelta(hours=evening_start.hour, minutes=evening_start.minute)
+
+    return db.session.execute(AVAILABILITY_QUERY, {
+        'artist_id': artist.id,
+        'genre_ids': list(artist.genre_ids),
+        'start': start,
+        'end': end,
+        'evening_start': evening_start,
+        'evening_end': evening_start + timedelta(hours=evening_hours),
+        'city': city,
+        'state': state,
+        'limit': limit,
+    }).fetchall()
@@ -0,0 +1,89 @@
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+# Benchmarks seed the disposable database of the tests, see README.md. The
+# config is read when app is imported, so the environment is set first.
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+if not TEST_DATABASE_URL:
+    sys.exit('Set TEST_DATABASE_URL to a database the benchmark may drop and fill')
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+os.environ.setdefault('CACHE_TYPE', 'null')
+os.environ['DATABASE_REPLICA_URLS'] = ''
+
+from app import app  # noqa: E402
+from queries import record_queries  # noqa: E402
+from tests.catalogue import create_schema, seed_catalogue  # noqa: E402
+
+# Only the report is printed, not the request and slow query log lines
+app.logger.setLevel(logging.ERROR)
+
+Result = namedtuple('Result', 'name queries durations')
+
+
+def parser(description, **defaults):
+    # Command line of a benchmark: the size of the catalogue and the runs
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--venues', type=int, default=defaults.get('venues', 10000))
+    parser.add_argument('--artists', type=int, default=defaults.get('artists', 10000))
+    parser.add_argument('--shows', type=int, default=defaults.get('shows', 50000))
+    parser.add_argument('--runs', type=int, default=defaults.get('runs', 50))
+    return parser
+
+
+def seed(args):
+    start = time.perf_counter()
+    with app.app_context():
+        create_schema()
+        seed_catalogue(args.venues, args.artists, args.shows)
+    print('Seeded {} venues, {} artists and {} shows in {:.1f} s'.format(
+        args.venues, args.artists, args.shows, time.perf_counter() - start))
+
+
+def measure(client, name, path, runs, method='GET', data=None):
+    # Latencies and queries of a request repeated runs times, after a warm up
+    client.open(path, method=method, data=data)
+    durations = []
+
+    for run in range(runs):
+        with record_queries() as queries:
+            start = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            durations.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise AssertionError('{} answered {}'.format(path, response.status_code))
+
+    return Result(name, queries.count, durations)
+
+
+def measure_call(name, function, runs):
+    # Latencies and queries of a function called runs times in an app context
+    with app.app_context():
+        function()
+        durations = []
+
+        for run in range(runs):
+            with record_queries() as queries:
+                start = time.perf_counter()
+                function()
+                durations.append(time.perf_counter() - start)
+
+    return Result(name, queries.count, durations)
+
+
+def percentile(durations, share):
+    return sorted(durations)[min(len(durations) - 1, int(len(durations) * share))]
+
+
+def report(results):
+    print('{:<32} {:>7} {:>9} {:>9} {:>9}'.format('request', 'queries', 'p50 ms', 'p95 ms', 'max ms'))
+    for result in results:
+        print('{:<32} {:>7} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+            result.name, result.queries,
+            statistics.median(result.durations) * 1000,
+            percentile(result.durations, 0.95) * 1000,
+            max(result.durations) * 1000))
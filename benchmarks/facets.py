@@ -0,0 +1,29 @@
+from benchmarks.common import app, measure, measure_call, parser, report, seed
+from facets import count_facets
+from models import Venue, Artist
+
+# Latency of the facet counts over 100k venues and 100k artists, uncached:
+# the counts query alone, with and without filters, and the facet pages
+#
+#     TEST_DATABASE_URL=... python -m benchmarks.facets
+
+
+def main():
+    args = parser('Benchmark the facet counts', venues=100000, artists=100000,
+                  shows=100000).parse_args()
+    seed(args)
+
+    client = app.test_client()
+    report([
+        measure_call('venue facets', lambda: count_facets(Venue, {}), args.runs),
+        measure_call('venue facets state=CA', lambda: count_facets(Venue, {'state': 'CA'}), args.runs),
+        measure_call('venue facets genre=Jazz', lambda: count_facets(Venue, {'genre': 'Jazz'}), args.runs),
+        measure_call('artist facets', lambda: count_facets(Artist, {}), args.runs),
+        measure_call('artist facets seeking=true', lambda: count_facets(Artist, {'seeking': 'true'}), args.runs),
+        measure(client, '/venues', '/venues', args.runs),
+        measure(client, '/artists?genre=Jazz', '/artists?genre=Jazz', args.runs),
+    ])
+
+
+if __name__ == '__main__':
+    main()
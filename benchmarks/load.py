@@ -0,0 +1,82 @@
+import random
+import statistics
+import threading
+import time
+
+from benchmarks.common import app, parser, percentile, seed
+
+# Throughput and latency of the venue and artist pages as the number of
+# concurrent clients grows, e.g. to size the pool and the worker threads
+#
+#     TEST_DATABASE_URL=... python -m benchmarks.load --clients 1 4 16 --runs 100
+
+
+def paths(args, count):
+    # Detail pages of random venues and artists, the same for each run
+    pages = random.Random(0)
+    return [
+        '/venues/{}'.format(pages.randint(1, args.venues)) if number % 2
+        else '/artists/{}'.format(pages.randint(1, args.artists))
+        for number in range(count)
+    ]
+
+
+def load(args, clients):
+    # Latencies of all requests, and the wall clock time, of clients threads
+    # each requesting args.runs pages
+    work = paths(args, clients * args.runs)
+    durations = []
+    errors = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def run(number):
+        client = app.test_client()
+        # Warm up: the genre names and a pooled connection
+        client.get(work[number])
+        ready.wait()
+
+        own = []
+        for path in work[number::clients]:
+            start = time.perf_counter()
+            response = client.get(path)
+            own.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append('{} answered {}'.format(path, response.status_code))
+        with lock:
+            durations.extend(own)
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise AssertionError(errors[0])
+    return durations, elapsed
+
+
+def main():
+    arguments = parser('Detail pages under concurrent clients', venues=10000,
+                       artists=10000, shows=100000, runs=100)
+    arguments.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    args = arguments.parse_args()
+    seed(args)
+
+    print('{:<8} {:>8} {:>9} {:>9} {:>9} {:>9}'.format(
+        'clients', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'max ms'))
+    for clients in args.clients:
+        durations, elapsed = load(args, clients)
+        print('{:<8} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+            clients, len(durations), len(durations) / elapsed,
+            statistics.median(durations) * 1000,
+            percentile(durations, 0.99) * 1000,
+            max(durations) * 1000))
+
+
+if __name__ == '__main__':
+    main()
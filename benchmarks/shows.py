@@ -0,0 +1,47 @@
+import babel.dates
+from flask import render_template
+
+from benchmarks.common import app, measure, measure_call, parser, report, seed
+from app import DATETIME_FORMATS, DATETIME_LOCALE, format_datetime
+from view_models import SHOWS
+
+# Time to render the /shows template for 10k shows, and to format their
+# start times with the datetime filter and with Babel parsing the pattern on
+# every call, as the filter did before
+#
+#     TEST_DATABASE_URL=... python -m benchmarks.shows
+
+
+def load_items():
+    with app.app_context():
+        return [SHOWS.item(show) for show in SHOWS.query().order_by(*SHOWS.columns)]
+
+
+def render(items):
+    with app.test_request_context('/shows'):
+        return render_template('pages/shows.html', shows=items,
+                               page={'next_cursor': None, 'prev_cursor': None})
+
+
+def main():
+    args = parser('Benchmark rendering 10k shows', venues=1000, artists=1000,
+                  shows=10000, runs=10).parse_args()
+    seed(args)
+
+    items = load_items()
+    start_times = [item['start_time'] for item in items]
+    client = app.test_client()
+
+    report([
+        measure_call('render {} shows'.format(len(items)), lambda: render(items), args.runs),
+        measure_call('filter {} start times'.format(len(items)),
+                     lambda: [format_datetime(value, 'full') for value in start_times], args.runs),
+        measure_call('babel {} start times'.format(len(items)),
+                     lambda: [babel.dates.format_datetime(value, DATETIME_FORMATS['full'], locale=DATETIME_LOCALE)
+                              for value in start_times], args.runs),
+        measure(client, '/shows?limit=100', '/shows?limit=100', args.runs),
+    ])
+
+
+if __name__ == '__main__':
+    main()
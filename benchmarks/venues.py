@@ -0,0 +1,34 @@
+from benchmarks.common import app, measure, parser, report, seed
+from pagination import encode_cursor
+from view_models import VENUES
+
+# Latency and queries of the /venues listing over a large catalogue: first
+# page, a page deep in the keyset order, and pages filtered by facets
+#
+#     TEST_DATABASE_URL=... python -m benchmarks.venues --venues 100000
+
+
+def middle_cursor(count):
+    # Cursor of the page starting halfway through the venues
+    with app.app_context():
+        row = VENUES.query().order_by(*VENUES.columns).offset(count // 2).first()
+        return encode_cursor('next', VENUES.key(row))
+
+
+def main():
+    args = parser('Benchmark the /venues listing', venues=100000, artists=20000,
+                  shows=200000).parse_args()
+    seed(args)
+
+    client = app.test_client()
+    report([
+        measure(client, 'first page', '/venues', args.runs),
+        measure(client, 'middle page', '/venues?cursor=' + middle_cursor(args.venues), args.runs),
+        measure(client, 'state=CA', '/venues?state=CA', args.runs),
+        measure(client, 'genre=Jazz&seeking=true', '/venues?genre=Jazz&seeking=true', args.runs),
+        measure(client, 'limit=100', '/venues?limit=100', args.runs),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import g, has_request_context
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+
+class NullBackend(object):
+    # Caches nothing, e.g. for tests or debugging
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def generation(self, namespace):
+        return 0
+
+    def incr_generation(self, namespace):
+        pass
+
+    def invalidated_at(self, namespace):
+        return 0.0
+
+
+class LRUBackend(object):
+    # In-process least recently used cache, private to each worker
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = defaultdict(int)
+        self._invalidated_at = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations[namespace]
+
+    def incr_generation(self, namespace):
+        with self._lock:
+            self._generations[namespace] += 1
+            self._invalidated_at[namespace] = time.time()
+
+    def invalidated_at(self, namespace):
+        with self._lock:
+            return self._invalidated_at[namespace]
+
+
+class RedisBackend(object):
+    # Cache shared by all workers in a Redis compatible server
+
+    def __init__(self, url, prefix='fyyur:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, timeout):
+        self.client.setex(self.prefix + key, timeout, pickle.dumps(value))
+
+    def generation(self, namespace):
+        return int(self.client.get(self.prefix + 'generation:' + namespace) or 0)
+
+    def incr_generation(self, namespace):
+        pipeline = self.client.pipeline()
+        pipeline.incr(self.prefix + 'generation:' + namespace)
+        pipeline.set(self.prefix + 'invalidated_at:' + namespace, time.time())
+        pipeline.execute()
+
+    def invalidated_at(self, namespace):
+        return float(self.client.get(self.prefix + 'invalidated_at:' + namespace) or 0)
+
+
+#----------------------------------------------------------------------------#
+# Cache.
+#----------------------------------------------------------------------------#
+
+
+class Cache(object):
+    # Read-through cache of view models, grouped in namespaces such as
+    # 'venues'. Invalidating a namespace bumps its generation, which is part
+    # of every key, so all of its entries are dropped at once.
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.timeout = 60
+        self.replica_window = 0
+        self._counters = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'lru')
+
+        if cache_type == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif cache_type == 'lru':
+            self.backend = LRUBackend(app.config.get('CACHE_LRU_SIZE', 1024))
+        elif cache_type == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError('Unknown CACHE_TYPE: {}'.format(cache_type))
+
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+        self.replica_window = app.config.get('READ_AFTER_WRITE_SECONDS', 0)
+
+    def _count(self, namespace, counter):
+        with self._lock:
+            self._counters[namespace][counter] += 1
+
+    def get_or_set(self, namespace, key, load, timeout=None):
+        # Return the cached value of the key, loading and storing it on a miss
+        cache_key = '{}:{}:{}'.format(
+            namespace, self.backend.generation(namespace), key)
+
+        value = self.backend.get(cache_key)
+        if value is not None:
+            self._count(namespace, 'hits')
+            return value
+
+        self._count(namespace, 'misses')
+        value = load()
+        if self.fillable(namespace):
+            self.backend.set(cache_key, value, timeout or self.timeout)
+        return value
+
+    def fillable(self, namespace):
+        # A value read from a replica soon after a write may miss it; it is
+        # served but not stored, or the clients reading from the primary
+        # after their write would get it from the cache
+        if not (has_request_context() and g.get('replica')):
+            return True
+        return time.time() - self.backend.invalidated_at(namespace) > self.replica_window
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr_generation(namespace)
+            self._count(namespace, 'invalidations')
+
+    def stats(self):
+        with self._lock:
+            return {namespace: dict(counters)
+                    for namespace, counters in self._counters.items()}
+
+
+cache = Cache()
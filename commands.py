@@ -0,0 +1,206 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from assets import build_assets
+from cache import cache
+from counters import refresh_upcoming_show_counters, check_upcoming_show_counters
+from exporter import EXPORT_TABLES, EXPORT_WRITERS, export_table, load_state, save_state
+from importer import IMPORTERS, import_rows, read_rows
+from jobs import Worker, queue_stats, purge_jobs
+from matchmaking import refresh_matches
+
+#----------------------------------------------------------------------------#
+# Counters.
+#----------------------------------------------------------------------------#
+
+counters_cli = AppGroup('counters', help='Maintain the upcoming shows counters.')
+
+
+@counters_cli.command('refresh')
+def refresh_counters():
+    """Recount upcoming shows that became past shows. Run it periodically."""
+    updated = refresh_upcoming_show_counters()
+    if updated:
+        cache.invalidate('venues', 'artists')
+    click.echo('{} counters refreshed'.format(updated))
+
+
+@counters_cli.command('check')
+def check_counters():
+    """Compare the stored counters against a live recount."""
+    mismatches = check_upcoming_show_counters()
+
+    for table, id, stored, live in mismatches:
+        click.echo('{} {}: stored {}, live {}'.format(table, id, stored, live))
+
+    if mismatches:
+        raise click.ClickException(
+            '{} counters are out of date'.format(len(mismatches)))
+
+    click.echo('All counters are up to date')
+
+
+#----------------------------------------------------------------------------#
+# Matches.
+#----------------------------------------------------------------------------#
+
+matches_cli = AppGroup('matches', help='Maintain the venue and artist recommendations.')
+
+
+@matches_cli.command('refresh')
+def refresh_matches_command():
+    """Recompute the recommendations. Run it periodically."""
+    count = refresh_matches(current_app.config['MATCHES_LIMIT'])
+    click.echo('{} matches computed'.format(count))
+
+
+#----------------------------------------------------------------------------#
+# Assets.
+#----------------------------------------------------------------------------#
+
+assets_cli = AppGroup('assets', help='Build the static assets.')
+
+
+@assets_cli.command('build')
+def build_assets_command():
+    """Bundle, minify, fingerprint and compress the CSS/JS and resize the images.
+
+    Restart the app afterwards so it reads the new manifest.
+    """
+    manifest, notes = build_assets(current_app.static_folder)
+
+    for note in notes:
+        click.echo(note)
+
+    click.echo('{} bundles and {} images written to static/dist'.format(
+        len(manifest['files']), len(manifest['images'])))
+
+
+#----------------------------------------------------------------------------#
+# Jobs.
+#----------------------------------------------------------------------------#
+
+jobs_cli = AppGroup('jobs', help='Run and inspect the background jobs.')
+
+
+@jobs_cli.command('work')
+@click.option('--queue', 'queues', multiple=True,
+              help='Queue to work on, may be repeated. Defaults to all of JOB_QUEUES.')
+@click.option('--concurrency', type=int,
+              help='Threads per queue, instead of the JOB_QUEUES setting.')
+def work_jobs(queues, concurrency):
+    """Run the queued jobs until stopped with SIGTERM or Ctrl-C.
+
+    Several workers may run at once, on any hosts sharing the database;
+    each job is claimed by one of them.
+    """
+    config = current_app.config['JOB_QUEUES']
+    for queue in queues:
+        if queue not in config:
+            raise click.BadParameter('Unknown queue {}'.format(queue), param_hint='--queue')
+
+    threads = {queue: concurrency or config[queue] for queue in queues or config}
+    click.echo('Working on {}'.format(', '.join(
+        '{} ({} threads)'.format(queue, count) for queue, count in threads.items())))
+    Worker(current_app._get_current_object(), threads).run()
+
+
+@jobs_cli.command('status')
+def jobs_status():
+    """Show the job counts of each queue by status."""
+    for queue, counts in sorted(queue_stats().items()):
+        lag = counts.pop('lag', 0)
+        click.echo('{}: {}, oldest due job {:.0f}s late'.format(queue, ', '.join(
+            '{} {}'.format(count, status) for status, count in sorted(counts.items())), lag))
+
+
+@jobs_cli.command('purge')
+@click.option('--days', default=7, show_default=True,
+              help='Age of the done and failed jobs to delete.')
+def purge_jobs_command(days):
+    """Delete old done and failed jobs. Run it periodically."""
+    click.echo('{} jobs deleted'.format(purge_jobs(days)))
+
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Rows validated and inserted per transaction.')
+def import_command(kind, path, batch_size):
+    """Bulk import venues, artists or shows from a CSV or JSONL file.
+
+    Rows are validated with the same rules as the web forms. Shows
+    reference existing artist and venue ids.
+    """
+    def report_batch(number, inserted, errors):
+        click.echo('batch {}: {} inserted, {} errors'.format(
+            number, inserted, len(errors)))
+        for line_num, row_errors in errors:
+            for field, messages in row_errors.items():
+                click.echo('  line {}: {} - {}'.format(
+                    line_num if line_num is not None else '-', field, messages),
+                    err=True)
+
+    try:
+        rows = read_rows(path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='PATH')
+
+    report = import_rows(kind, rows, batch_size, report_batch)
+
+    # Imported shows change the upcoming shows counters
+    if kind == 'shows':
+        refresh_upcoming_show_counters()
+    cache.invalidate(*(['venues', 'artists', 'shows'] if kind == 'shows' else [kind]))
+
+    click.echo('{} rows: {} inserted, {} invalid, {} failed ({:.0f} rows/sec)'.format(
+        report.rows, report.inserted, report.invalid, report.failed,
+        report.rows_per_second))
+
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+
+@click.command('export')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--table', 'tables', multiple=True, type=click.Choice(list(EXPORT_TABLES)),
+              help='Table to export, may be repeated. Defaults to all tables.')
+@click.option('--format', 'format', default='csv', show_default=True,
+              type=click.Choice(sorted(EXPORT_WRITERS)),
+              help='Output format; parquet needs pyarrow.')
+@click.option('--incremental', is_flag=True,
+              help='Only export rows added or changed since the last incremental export.')
+def export_command(directory, tables, format, incremental):
+    """Export venues, artists and shows to files of DIRECTORY.
+
+    Rows are streamed from a server side cursor, so memory use does not
+    grow with the size of the tables. Incremental exports remember the
+    updated_at and id of the last row exported from each table in
+    export_state.json.
+    """
+    os.makedirs(directory, exist_ok=True)
+    state = load_state(directory) if incremental else {}
+
+    for name in tables or EXPORT_TABLES:
+        try:
+            path, count, position = export_table(
+                name, directory, format, incremental, state.get(name))
+        except ImportError:
+            raise click.ClickException('The parquet format needs pyarrow installed')
+
+        if incremental and position is not None:
+            state[name] = position
+            save_state(directory, state)
+
+        click.echo('{}: {} rows written to {}'.format(name, count, path))
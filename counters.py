@@ -0,0 +1,117 @@
+from collections import Counter
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Upcoming shows counters.
+#----------------------------------------------------------------------------#
+
+# Models carrying a num_upcoming_shows counter, with their key on shows
+COUNTED_MODELS = (
+    (Venue, Show.venue_id),
+    (Artist, Show.artist_id),
+)
+
+
+def add_upcoming_show(venue_id, artist_id, delta=1):
+    # Adjust the counters of a show's venue and artist in the caller's transaction
+    Venue.query.filter(Venue.id == venue_id).update(
+        {Venue.num_upcoming_shows: Venue.num_upcoming_shows + delta},
+        synchronize_session=False)
+    Artist.query.filter(Artist.id == artist_id).update(
+        {Artist.num_upcoming_shows: Artist.num_upcoming_shows + delta},
+        synchronize_session=False)
+
+
+def add_upcoming_shows(shows):
+    # Adjust the counters of the venues and artists of many shows with one
+    # update per table, in the caller's transaction
+    now = datetime.now()
+
+    for model, show_key in COUNTED_MODELS:
+        counts = Counter(show[show_key.key] for show in shows if show['start_time'] > now)
+        if not counts:
+            continue
+
+        added = db.values(
+            db.column('id', db.Integer),
+            db.column('num_upcoming_shows', db.Integer),
+            name='added'
+        ).data(list(counts.items()))
+
+        model.query.filter(model.id == added.c.id).update(
+            {model.num_upcoming_shows:
+                model.num_upcoming_shows + added.c.num_upcoming_shows},
+            synchronize_session=False)
+
+
+def remove_venue_upcoming_shows(venue_id):
+    # Take the upcoming shows of a venue off its artists' counters
+    released = db.session.query(
+        Show.artist_id.label('artist_id'),
+        db.func.count(Show.id).label('num_upcoming_shows')
+    ).filter(
+        Show.venue_id == venue_id, Show.start_time > datetime.now()
+    ).group_by(Show.artist_id).subquery()
+
+    Artist.query.filter(Artist.id == released.c.artist_id).update(
+        {Artist.num_upcoming_shows:
+            Artist.num_upcoming_shows - released.c.num_upcoming_shows},
+        synchronize_session=False)
+
+
+def live_upcoming_show_counts(model, show_key, since=None, until=None):
+    # Subquery recounting the upcoming shows of every row of the model, or
+    # only of the rows with shows starting from since until until
+    query = db.session.query(
+        model.id.label('id'),
+        db.func.count(Show.id).filter(
+            Show.start_time > datetime.now()).label('num_upcoming_shows')
+    ).outerjoin(Show, show_key == model.id)
+
+    if since is not None:
+        query = query.filter(model.id.in_(db.select(show_key).where(
+            Show.start_time >= since, Show.start_time < until)))
+
+    return query.group_by(model.id).subquery()
+
+
+def refresh_upcoming_show_counters(since=None, until=None):
+    # Rewrite the counters that drifted from a live recount, e.g. because
+    # upcoming shows became past shows; only those of the venues and artists
+    # of the shows starting from since until until if given. Returns the
+    # number of rows updated.
+    updated = 0
+
+    for model, show_key in COUNTED_MODELS:
+        counts = live_upcoming_show_counts(model, show_key, since, until)
+        updated += model.query.filter(
+            model.id == counts.c.id,
+            model.num_upcoming_shows != counts.c.num_upcoming_shows
+        ).update(
+            {model.num_upcoming_shows: counts.c.num_upcoming_shows},
+            synchronize_session=False)
+
+    db.session.commit()
+    return updated
+
+
+def check_upcoming_show_counters():
+    # Counters that differ from a live recount, as (table, id, stored, live)
+    mismatches = []
+
+    for model, show_key in COUNTED_MODELS:
+        counts = live_upcoming_show_counts(model, show_key)
+        rows = db.session.query(
+            model.id,
+            model.num_upcoming_shows,
+            counts.c.num_upcoming_shows
+        ).filter(
+            model.id == counts.c.id,
+            model.num_upcoming_shows != counts.c.num_upcoming_shows
+        ).order_by(model.id).all()
+
+        mismatches.extend((model.__tablename__,) + tuple(row) for row in rows)
+
+    return mismatches
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import any_
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+
+from models import db, Genre, Venue, Artist, Show
+
+# Tables that can be exported, in dependency order
+EXPORT_TABLES = {
+    'venues': Venue.__table__,
+    'artists': Artist.__table__,
+    'shows': Show.__table__,
+}
+
+# Rows fetched per round trip from the server side cursor
+EXPORT_BATCH_SIZE = 5000
+
+STATE_FILE = 'export_state.json'
+
+# Incremental exports leave out the rows changed in the last seconds. Their
+# updated_at is the start of the writing transaction, so a transaction
+# committing late could otherwise land behind a position already exported.
+EXPORT_SETTLE_SECONDS = 60
+
+#----------------------------------------------------------------------------#
+# Reading.
+#----------------------------------------------------------------------------#
+
+
+def genre_names(column):
+    # Genre codes of a row as their names, the way `flask import` reads them
+    names = db.select(db.func.array_agg(aggregate_order_by(Genre.name, Genre.id))).where(
+        Genre.id == any_(column)).scalar_subquery()
+    return db.type_coerce(
+        db.func.coalesce(names, db.cast([], ARRAY(db.String))), ARRAY(db.String)).label('genres')
+
+
+def export_columns(table):
+    # Stored columns of a table; columns computed by Postgres are left out
+    columns = []
+
+    for column in table.columns:
+        if column.computed is not None:
+            continue
+        if column.name == 'genre_ids':
+            column = genre_names(column)
+        columns.append(column)
+
+    return columns
+
+
+def changed_after(query, table, position):
+    # Rows added or changed after the (updated_at, id) position of the last
+    # incremental export, in that order. Positions saved as a bare id by
+    # earlier versions still skip the rows up to that id.
+    settled = db.literal_column('localtimestamp', db.DateTime) - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    query = query.where(table.c.updated_at < settled).order_by(table.c.updated_at, table.c.id)
+
+    if isinstance(position, dict):
+        query = query.where(db.tuple_(table.c.updated_at, table.c.id) > (
+            datetime.fromisoformat(position['updated_at']), position['id']))
+    elif position is not None:
+        query = query.where(table.c.id > position)
+
+    return query
+
+
+def read_batches(table, incremental=False, position=None, batch_size=EXPORT_BATCH_SIZE):
+    # Yield lists of rows from a server side cursor, so only one batch is
+    # held in memory whatever the size of the table. Rows are ordered by id,
+    # or by (updated_at, id) after the position of an incremental export.
+    query = db.select(*export_columns(table))
+    if incremental:
+        query = changed_after(query, table, position)
+    else:
+        query = query.order_by(table.c.id)
+
+    result = db.session.connection().execution_options(
+        stream_results=True).execute(query)
+
+    try:
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        result.close()
+
+
+#----------------------------------------------------------------------------#
+# Writers.
+#----------------------------------------------------------------------------#
+
+
+def csv_value(value):
+    # Genres are written comma separated, as `flask import` reads them
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return value
+
+
+class CSVWriter(object):
+    extension = 'csv'
+
+    def __init__(self, path, table):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in export_columns(table)])
+
+    def write(self, rows):
+        self.writer.writerows([csv_value(value) for value in row] for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    # Columnar output; each batch becomes a row group. Needs pyarrow.
+    extension = 'parquet'
+
+    def __init__(self, path, table):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.schema = self.table_schema(table)
+        self.writer = pyarrow.parquet.ParquetWriter(
+            path, self.schema, compression='zstd')
+
+    def table_schema(self, table):
+        pa = self.pyarrow
+        types = {
+            'Integer': pa.int64(),
+            'Boolean': pa.bool_(),
+            'DateTime': pa.timestamp('us'),
+            'ARRAY': pa.list_(pa.string()),
+        }
+        return pa.schema([
+            (column.name, types.get(type(column.type).__name__, pa.string()))
+            for column in export_columns(table)
+        ])
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        batch = self.pyarrow.record_batch(
+            [self.pyarrow.array(values, type=field.type)
+             for values, field in zip(columns, self.schema)],
+            schema=self.schema)
+        self.writer.write_table(self.pyarrow.Table.from_batches([batch]))
+
+    def close(self):
+        self.writer.close()
+
+
+EXPORT_WRITERS = {
+    'csv': CSVWriter,
+    'parquet': ParquetWriter,
+}
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+
+def load_state(directory):
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(directory, state):
+    path = os.path.join(directory, STATE_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def position_name(position):
+    # Part of the file name of an incremental export after a position
+    if isinstance(position, dict):
+        return '{:%Y%m%dT%H%M%S}-{}'.format(
+            datetime.fromisoformat(position['updated_at']), position['id'])
+    return str(position)
+
+
+def export_table(name, directory, format='csv', incremental=False, position=None):
+    # Export the rows of a table to a file of the directory; incremental
+    # exports only the rows changed after the position of the last one.
+    # Returns (path, rows written, position of the last row written).
+    table = EXPORT_TABLES[name]
+    writer_class = EXPORT_WRITERS[format]
+
+    if position is None:
+        filename = '{}.{}'.format(name, writer_class.extension)
+    else:
+        filename = '{}.after-{}.{}'.format(name, position_name(position), writer_class.extension)
+    path = os.path.join(directory, filename)
+
+    writer = writer_class(path, table)
+    count = 0
+
+    try:
+        for rows in read_batches(table, incremental, position):
+            writer.write(rows)
+            count += len(rows)
+            if incremental:
+                position = {'updated_at': rows[-1].updated_at.isoformat(), 'id': rows[-1].id}
+    finally:
+        writer.close()
+
+    return path, count, position
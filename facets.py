@@ -0,0 +1,161 @@
+from flask import current_app
+
+from cache import cache
+from forms import STATE_CHOICES
+from http_cache import version_key
+from models import db, Genre, Venue, Artist
+
+# Facets of the venue and artist listings, in the order they are shown and
+# in the order of their values in the cache keys
+FACETS = ('state', 'city', 'genre', 'seeking')
+
+# Flag column of the seeking facet of each model
+SEEKING_COLUMNS = {
+    Venue: Venue.seeking_talent,
+    Artist: Artist.seeking_venue,
+}
+
+SEEKING_LABELS = {
+    Venue: {'true': 'Seeking talent', 'false': 'Not seeking talent'},
+    Artist: {'true': 'Seeking venues', 'false': 'Not seeking venues'},
+}
+
+# Facet of a row of the counts query, from grouping(city, genre_ids, seeking):
+# a bit is set for each of the three columns left out of the row's set
+FACET_GROUPINGS = {
+    0b111: 'state',
+    0b011: 'city',
+    0b101: 'genre',
+    0b110: 'seeking',
+}
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+
+def facet_filters(args):
+    # Facet values selected with the request arguments
+    return {facet: args[facet] for facet in FACETS if args.get(facet)}
+
+
+def filters_key(filters):
+    return ':'.join(filters.get(facet, '') for facet in FACETS)
+
+
+def filter_query(query, model, filters):
+    # Keep the rows of a venue or artist query matching the selected facets
+    if 'state' in filters:
+        query = query.filter(model.state == filters['state'])
+
+    if 'city' in filters:
+        query = query.filter(model.city == filters['city'])
+
+    if 'genre' in filters:
+        # The containment test uses the GIN index on genre_ids
+        genre_id = Genre.id_of(filters['genre'])
+        if genre_id is None:
+            return query.filter(db.false())
+        query = query.filter(model.genre_ids.contains([genre_id]))
+
+    if 'seeking' in filters:
+        query = query.filter(SEEKING_COLUMNS[model].is_(filters['seeking'] == 'true'))
+
+    return query
+
+#----------------------------------------------------------------------------#
+# Counts.
+#----------------------------------------------------------------------------#
+
+
+def facet_value(filters, facet, value, **extra):
+    # A value of a facet with the filters of its link, which toggles it
+    args = dict(filters)
+    selected = args.get(facet) == value
+
+    if selected:
+        del args[facet]
+    else:
+        args[facet] = value
+        args.update(extra)
+
+    # A new state clears the city, which belongs to the previous one
+    if facet == 'state':
+        args.pop('city', None)
+
+    return {'value': value, 'selected': selected, 'args': args}
+
+
+def count_facets(model, filters):
+    # Count the venues or artists matching the selected facets for each
+    # value of each facet, with one GROUPING SETS query. Rows are grouped by
+    # their whole genre_ids array, which has few distinct values, and each
+    # genre's count is summed from those groups: unnesting the arrays in SQL
+    # multiplied the rows to group and made the query several times slower.
+    seeking = SEEKING_COLUMNS[model]
+
+    query = db.session.query(
+        model.state,
+        model.city,
+        model.genre_ids,
+        seeking.label('seeking'),
+        db.func.grouping(model.city, model.genre_ids, seeking).label('facet'),
+        db.func.count().label('count')
+    ).group_by(
+        db.func.grouping_sets(
+            db.tuple_(model.state),
+            db.tuple_(model.city, model.state),
+            db.tuple_(model.genre_ids),
+            db.tuple_(seeking)
+        ))
+
+    rows = filter_query(query, model, filters).all()
+
+    # Group counts by facet
+    counts = {facet: {} for facet in FACETS}
+    for row in rows:
+        facet = FACET_GROUPINGS[row.facet]
+        if facet == 'genre':
+            for genre_id in set(row.genre_ids or ()):
+                counts['genre'][genre_id] = counts['genre'].get(genre_id, 0) + row.count
+            continue
+        if facet == 'city':
+            value = (row.city, row.state) if row.city and row.state else None
+        else:
+            value = getattr(row, facet)
+        if value is not None:
+            counts[facet][value] = row.count
+
+    # States in the order of the form, genres by name, cities by count
+    data_states = [dict(facet_value(filters, 'state', state), label=label, count=counts['state'][state])
+                   for state, label in STATE_CHOICES if state in counts['state']]
+
+    genre_names = dict(Genre.cached())
+    data_genres = sorted(
+        [dict(facet_value(filters, 'genre', genre_names[genre_id]), label=genre_names[genre_id], count=count)
+         for genre_id, count in counts['genre'].items() if genre_id in genre_names],
+        key=lambda item: item['label'])
+
+    cities = sorted(counts['city'].items(), key=lambda item: (-item[1], item[0]))
+    data_cities = [dict(facet_value(filters, 'city', city, state=state),
+                        label='{}, {}'.format(city, state), count=count)
+                   for (city, state), count in cities[:current_app.config['FACET_CITIES_LIMIT']]]
+
+    data_seeking = [dict(facet_value(filters, 'seeking', value), label=SEEKING_LABELS[model][value],
+                         count=counts['seeking'][flag])
+                    for value, flag in (('true', True), ('false', False)) if flag in counts['seeking']]
+
+    return {
+        'state': data_states,
+        'city': data_cities,
+        'genre': data_genres,
+        'seeking': data_seeking,
+    }
+
+
+def cached_facets(namespace, model, filters):
+    # Facet counts do not depend on the page, so all pages of a listing with
+    # the same filters share them; writes to the namespace invalidate them,
+    # and in a conditional view they are of its version
+    return cache.get_or_set(namespace, 'facets:{}:{}'.format(version_key(), filters_key(filters)),
+                            lambda: count_facets(model, filters))
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from werkzeug.http import is_resource_modified
+
+from models import db, Venue, Artist, Show, Match, TableVersion
+
+#----------------------------------------------------------------------------#
+# Versions.
+#----------------------------------------------------------------------------#
+
+# A version is a tuple of values read with one cheap query that changes
+# whenever the response built from the same request would: last changes of
+# the rows shown, and row counts to catch deletions, or the versions of the
+# tables shown.
+
+
+def detail_version(model, show_key, other, other_key, match_key, entity_id):
+    # Version of a venue or artist page: the entity, its shows, the names of
+    # the other side of the shows, shows turning past and recommendations.
+    # None if there is no such entity.
+    return db.session.query(
+        model.updated_at,
+        db.func.max(Show.updated_at),
+        db.func.max(other.updated_at),
+        db.func.count(Show.id),
+        db.func.count(Show.id).filter(Show.start_time > datetime.now()),
+        db.select(db.func.count(Match.score)).where(match_key == entity_id).scalar_subquery(),
+        db.select(db.func.sum(Match.score)).where(match_key == entity_id).scalar_subquery()
+    ).outerjoin(Show, show_key == model.id).outerjoin(
+        other, other.id == other_key).filter(
+        model.id == entity_id).group_by(model.id).first()
+
+
+def venue_version(venue_id):
+    return detail_version(Venue, Show.venue_id, Artist, Show.artist_id, Match.venue_id, venue_id)
+
+
+def artist_version(artist_id):
+    return detail_version(Artist, Show.artist_id, Venue, Show.venue_id, Match.artist_id, artist_id)
+
+
+def tables_version(*models):
+    # Version of a listing: version and last change of each table it shows,
+    # kept by triggers, instead of scanning the tables. None if a table has
+    # no version.
+    names = sorted(model.__tablename__ for model in models)
+    rows = db.session.query(TableVersion.version, TableVersion.changed_at).filter(
+        TableVersion.table_name.in_(names)).order_by(TableVersion.table_name).all()
+    if len(rows) != len(names):
+        return None
+
+    return tuple(value for row in rows for value in row)
+
+
+def version_key():
+    # Part of the cache keys of the data of a conditional view, so a cached
+    # body is of the version whose ETag it is sent with, even if another
+    # worker's write has not invalidated this worker's cache
+    values = g.get('version')
+    if values is None:
+        return ''
+    return hashlib.sha1(repr(tuple(values)).encode('utf-8')).hexdigest()[:16]
+
+#----------------------------------------------------------------------------#
+# Conditional responses.
+#----------------------------------------------------------------------------#
+
+
+def conditional(version):
+    # Give the responses of a GET view an ETag and Last-Modified from
+    # version(*view_args), and answer a matching conditional request with
+    # 304 before the view loads or renders anything
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            values = g.version = version(*args, **kwargs)
+            if values is None:
+                return view(*args, **kwargs)
+
+            # Pages of a listing share a version, so the URL is part of the tag
+            etag = hashlib.sha1(repr((request.full_path, tuple(values))).encode('utf-8')).hexdigest()
+            last_modified = max([value for value in values if isinstance(value, datetime)], default=None)
+
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers revalidate on every visit instead of guessing freshness
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
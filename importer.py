@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import os
+import time
+from collections import namedtuple
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Genre, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Readers.
+#----------------------------------------------------------------------------#
+
+# Columns of the pasted show lines
+SHOW_COLUMNS = ('artist_id', 'venue_id', 'start_time', 'duration')
+
+# Line of a file that is not a row, reported as an error of the line
+UnreadableRow = namedtuple('UnreadableRow', 'message')
+
+
+def read_csv(path):
+    # Yield (line number, row) of a CSV file with a header line. Multiple
+    # genres are separated by commas inside the quoted genres column.
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row.get('genres'):
+                row['genres'] = [genre.strip() for genre in row['genres'].split(',')]
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    # Yield (line number, row) of a file with one JSON object per line
+    with open(path, encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, UnreadableRow('Invalid JSON: {}'.format(e))
+                continue
+            if not isinstance(row, dict):
+                yield line_num, UnreadableRow('Not a JSON object')
+                continue
+            yield line_num, row
+
+
+def read_show_lines(text):
+    # Yield (line number, row) of shows pasted one per line as
+    # artist_id,venue_id,start_time[,duration], skipping a header line
+    reader = csv.reader(io.StringIO(text))
+    for values in reader:
+        values = [value.strip() for value in values]
+        if not any(values) or values[0] == 'artist_id':
+            continue
+        row = dict(zip(SHOW_COLUMNS, values))
+        # Only the duration has a default, which applies when it is left empty
+        if not row.get('duration'):
+            row.pop('duration', None)
+        yield reader.line_num, row
+
+
+def read_rows(path):
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        return read_csv(path)
+    if extension in ('.jsonl', '.ndjson'):
+        return read_jsonl(path)
+
+    raise ValueError('Unsupported file type: {}'.format(extension))
+
+
+#----------------------------------------------------------------------------#
+# Validation.
+#----------------------------------------------------------------------------#
+
+
+def form_data(row):
+    # Turn a row into form data, as a browser would post it
+    data = MultiDict()
+
+    for field, value in row.items():
+        if value is None or value is False:
+            continue
+        if isinstance(value, list):
+            for item in value:
+                data.add(field, item)
+        elif value is True:
+            data.add(field, 'y')
+        else:
+            data.add(field, str(value))
+
+    return data
+
+
+def validate_row(form_class, row):
+    # Validate a row with the rules of the form, outside of a request.
+    # Returns (values, errors).
+    form = form_class(formdata=form_data(row), meta={'csrf': False})
+
+    if not form.validate():
+        return None, form.errors
+
+    values = form.data
+
+    # Genres are stored as codes of the genres table
+    if 'genres' in values:
+        values['genre_ids'] = Genre.ids_of(values.pop('genres'))
+
+    return values, None
+
+
+# Model and row validator of each importable kind of record
+IMPORTERS = {
+    'venues': (Venue, lambda row: validate_row(VenueForm, row)),
+    'artists': (Artist, lambda row: validate_row(ArtistForm, row)),
+    'shows': (Show, lambda row: validate_row(ShowForm, row)),
+}
+
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+
+class ImportReport(object):
+
+    def __init__(self):
+        self.inserted = 0
+        self.invalid = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def rows(self):
+        return self.inserted + self.invalid + self.failed
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+def import_rows(kind, rows, batch_size=1000, report_batch=None):
+    # Validate and insert (line number, row) pairs in batches. Each batch is
+    # inserted with one executemany and committed on its own, so a failing
+    # batch is rolled back and reported without stopping the import.
+    # report_batch(number, inserted, errors) is called after each batch.
+    model, validate = IMPORTERS[kind]
+    report = ImportReport()
+    rows = iter(rows)
+    number = 0
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        number += 1
+
+        values = []
+        errors = []
+
+        for line_num, row in batch:
+            if isinstance(row, UnreadableRow):
+                errors.append((line_num, {'line': [row.message]}))
+                continue
+            row_values, row_errors = validate(row)
+            if row_errors:
+                errors.append((line_num, row_errors))
+            else:
+                values.append(row_values)
+
+        report.invalid += len(errors)
+        inserted = 0
+
+        if values:
+            try:
+                db.session.execute(model.__table__.insert(), values)
+                db.session.commit()
+                inserted = len(values)
+            except Exception as e:
+                db.session.rollback()
+                report.failed += len(values)
+                errors.append((None, {'batch': [str(e)]}))
+
+        report.inserted += inserted
+
+        if report_batch is not None:
+            report_batch(number, inserted, errors)
+
+    return report
@@ -0,0 +1,227 @@
+import random
+import signal
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+
+from models import db, Job
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+#----------------------------------------------------------------------------#
+# Tasks.
+#----------------------------------------------------------------------------#
+
+Task = namedtuple('Task', ['name', 'function', 'queue', 'max_attempts'])
+
+# Registered tasks by name, see tasks.py
+TASKS = {}
+
+
+def task(name, queue='default', max_attempts=None):
+    # Register a function as the task of a name; jobs call it with their
+    # payload as keyword arguments, in an app context
+    def decorator(function):
+        TASKS[name] = Task(name, function, queue, max_attempts)
+        return function
+
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, run_at=None):
+    # Add a job in the caller's transaction, so it only runs if the write
+    # that needs it is committed. A job with the same idempotency key is
+    # enqueued once, until purged.
+    enqueue_many(name, [(payload, key, run_at)])
+
+
+def enqueue_many(name, jobs):
+    # Add jobs of a task from (payload, key, run_at) tuples with one statement
+    registered = TASKS[name]
+    max_attempts = registered.max_attempts or current_app.config['JOB_MAX_ATTEMPTS']
+
+    statement = insert(Job.__table__).on_conflict_do_nothing(index_elements=['idempotency_key'])
+    db.session.execute(statement, [{
+        'queue': registered.queue,
+        'task': name,
+        'payload': payload or {},
+        'idempotency_key': key,
+        'max_attempts': max_attempts,
+        'run_at': run_at or datetime.now(),
+    } for payload, key, run_at in jobs])
+
+#----------------------------------------------------------------------------#
+# Queue.
+#----------------------------------------------------------------------------#
+
+
+def claim(queue):
+    # Take the next due job of a queue, skipping the rows other workers hold
+    # locked, and commit it as running. None if no job is due.
+    due = db.select(Job.id).where(
+        Job.queue == queue, Job.status == QUEUED, Job.run_at <= datetime.now()
+    ).order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+    job = db.session.execute(
+        db.update(Job).where(Job.id == due).values(
+            status=RUNNING, attempts=Job.attempts + 1, locked_at=datetime.now()
+        ).returning(Job.id, Job.task, Job.payload, Job.attempts, Job.max_attempts)
+    ).first()
+    db.session.commit()
+    return job
+
+
+def finish(job):
+    db.session.execute(db.update(Job).where(Job.id == job.id).values(
+        status=DONE, finished_at=datetime.now(), last_error=None))
+    db.session.commit()
+
+
+def retry_delay(attempts):
+    # Exponential backoff, with jitter so failed jobs do not retry in step
+    config = current_app.config
+    delay = min(config['JOB_RETRY_DELAY'] * 2 ** (attempts - 1), config['JOB_RETRY_MAX_DELAY'])
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def fail(job, error):
+    # Queue the job again after a delay, or give up after its last attempt
+    if job.attempts < job.max_attempts:
+        values = {'status': QUEUED, 'run_at': datetime.now() + retry_delay(job.attempts)}
+    else:
+        values = {'status': FAILED, 'finished_at': datetime.now()}
+
+    db.session.execute(db.update(Job).where(Job.id == job.id).values(
+        last_error=repr(error), **values))
+    db.session.commit()
+
+
+def requeue_stale(timeout):
+    # Queue again the jobs left running by a worker that died, unless that
+    # was their last attempt. Returns the number of jobs requeued or failed.
+    count = db.session.execute(db.update(Job).where(
+        Job.status == RUNNING, Job.locked_at < datetime.now() - timedelta(seconds=timeout)
+    ).values(
+        status=db.case((Job.attempts < Job.max_attempts, QUEUED), else_=FAILED),
+        run_at=datetime.now(),
+        finished_at=db.case((Job.attempts < Job.max_attempts, db.null()), else_=datetime.now()),
+        last_error='Worker died while running the job'
+    )).rowcount
+    db.session.commit()
+    return count
+
+
+def run_job(job):
+    registered = TASKS.get(job.task)
+    try:
+        if registered is None:
+            raise LookupError('Unknown task {}'.format(job.task))
+        registered.function(**job.payload)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts)
+        fail(job, e)
+    else:
+        finish(job)
+    finally:
+        db.session.close()
+
+
+def queue_stats():
+    # Job counts by queue and status, and the age of the oldest due job of
+    # each queue in seconds
+    stats = {}
+
+    for queue, status, count in db.session.query(
+            Job.queue, Job.status, db.func.count(Job.id)).group_by(Job.queue, Job.status):
+        stats.setdefault(queue, {})[status] = count
+
+    for queue, oldest in db.session.query(Job.queue, db.func.min(Job.run_at)).filter(
+            Job.status == QUEUED, Job.run_at <= datetime.now()).group_by(Job.queue):
+        stats[queue]['lag'] = (datetime.now() - oldest).total_seconds()
+
+    return stats
+
+
+def purge_jobs(days):
+    # Delete the jobs done or failed more than days ago, which frees their
+    # idempotency keys. Returns the number of jobs deleted.
+    count = Job.query.filter(
+        Job.status.in_([DONE, FAILED]),
+        Job.finished_at < datetime.now() - timedelta(days=days)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+#----------------------------------------------------------------------------#
+# Worker.
+#----------------------------------------------------------------------------#
+
+
+class Worker(object):
+    # Runs the jobs of each queue on as many threads as its concurrency,
+    # until stopped by SIGTERM or Ctrl-C. A job being run when stopped is
+    # finished first.
+
+    def __init__(self, app, queues):
+        self.app = app
+        self.queues = queues
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.timeout = app.config['JOB_TIMEOUT']
+        self.stopping = threading.Event()
+
+    def work(self, queue):
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    job = claim(queue)
+                except Exception:
+                    db.session.rollback()
+                    current_app.logger.exception('Could not claim a job of queue %s', queue)
+                    job = None
+
+                if job is None:
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                run_job(job)
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+
+        threads = [
+            threading.Thread(target=self.work, args=(queue,),
+                             name='jobs-{}-{}'.format(queue, number))
+            for queue, concurrency in self.queues.items()
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # The main thread requeues the jobs of dead workers meanwhile
+        try:
+            with self.app.app_context():
+                while not self.stopping.is_set():
+                    try:
+                        requeued = requeue_stale(self.timeout)
+                        if requeued:
+                            current_app.logger.warning('%s stale jobs requeued or failed', requeued)
+                    except Exception:
+                        db.session.rollback()
+                        current_app.logger.exception('Could not requeue stale jobs')
+                    self.stopping.wait(self.poll_interval * 10)
+        except KeyboardInterrupt:
+            self.stop()
+
+        for thread in threads:
+            thread.join()
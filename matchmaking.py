@@ -0,0 +1,87 @@
+from models import db, Venue, Artist, Match
+
+#----------------------------------------------------------------------------#
+# Matchmaking.
+#----------------------------------------------------------------------------#
+
+# Pairs every venue seeking talent with the artists seeking a venue that
+# share one of its genres; the && join uses the GIN indexes on genre_ids. A pair
+# scores one point per shared genre, plus two for the same city and state or
+# one for the same state only. Pairs in the top of either side are kept.
+REFRESH_MATCHES_QUERY = db.text("""
+    INSERT INTO matches (venue_id, artist_id, score)
+    SELECT venue_id, artist_id, score
+    FROM (
+        SELECT venue_id,
+               artist_id,
+               score,
+               row_number() OVER (PARTITION BY venue_id
+                                  ORDER BY score DESC, artist_id) AS venue_rank,
+               row_number() OVER (PARTITION BY artist_id
+                                  ORDER BY score DESC, venue_id) AS artist_rank
+        FROM (
+            SELECT venues.id AS venue_id,
+                   artists.id AS artist_id,
+                   cardinality(ARRAY(
+                       SELECT unnest(venues.genre_ids)
+                       INTERSECT
+                       SELECT unnest(artists.genre_ids)
+                   ))
+                   + CASE
+                       WHEN venues.state = artists.state
+                            AND lower(venues.city) = lower(artists.city) THEN 2
+                       WHEN venues.state = artists.state THEN 1
+                       ELSE 0
+                     END AS score
+            FROM venues
+            JOIN artists ON venues.genre_ids && artists.genre_ids
+            WHERE venues.seeking_talent AND artists.seeking_venue
+        ) AS pairs
+    ) AS ranked
+    WHERE venue_rank <= :limit OR artist_rank <= :limit
+""")
+
+
+def refresh_matches(limit=10):
+    # Recompute the matches in one transaction, so pages keep reading the
+    # previous matches until the new ones are committed. A refresh started
+    # meanwhile, e.g. by a job requeued while this one still runs, waits on
+    # the lock and then recomputes from the committed matches.
+    db.session.execute(db.select(db.func.pg_advisory_xact_lock(db.func.hashtext('matches.refresh'))))
+    Match.query.delete(synchronize_session=False)
+    db.session.execute(REFRESH_MATCHES_QUERY, {'limit': limit})
+    db.session.commit()
+
+    return Match.query.count()
+
+
+def venue_matches_select(venue_id, limit=10):
+    # Best artists for a venue, read from the precomputed matches
+    return db.select(
+        Artist.id,
+        Artist.name,
+        Artist.image_link,
+        Match.score
+    ).join(Match, Match.artist_id == Artist.id).where(
+        Match.venue_id == venue_id).order_by(
+        Match.score.desc(), Artist.id).limit(limit)
+
+
+def venue_matches(venue_id, limit=10):
+    return db.session.execute(venue_matches_select(venue_id, limit)).all()
+
+
+def artist_matches_select(artist_id, limit=10):
+    # Best venues for an artist, read from the precomputed matches
+    return db.select(
+        Venue.id,
+        Venue.name,
+        Venue.image_link,
+        Match.score
+    ).join(Match, Match.venue_id == Venue.id).where(
+        Match.artist_id == artist_id).order_by(
+        Match.score.desc(), Venue.id).limit(limit)
+
+
+def artist_matches(artist_id, limit=10):
+    return db.session.execute(artist_matches_select(artist_id, limit)).all()
@@ -0,0 +1,32 @@
+"""show indexes  migration
+
+Revision ID: 4e60771875cc
+Revises: 8b886afdf40b
+Create Date: 2026-10-18 10:12:41.318214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e60771875cc'
+down_revision = '8b886afdf40b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently, outside of a transaction, so the shows and venues
+    # stay readable and writable meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_venues_city_state', 'venues', ['city', 'state'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_venues_city_state', table_name='venues', postgresql_concurrently=True)
+        op.drop_index('ix_shows_artist_id_start_time', table_name='shows', postgresql_concurrently=True)
+        op.drop_index('ix_shows_venue_id_start_time', table_name='shows', postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""covering indexes  migration
+
+Revision ID: c6d2a8f41e93
+Revises: b3e9f0c47a15
+Create Date: 2026-10-18 19:20:14.502117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6d2a8f41e93'
+down_revision = 'b3e9f0c47a15'
+branch_labels = None
+depends_on = None
+
+
+# Indexes replaced, with their table, columns and included columns
+INDEXES = [
+    ('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], ['artist_id']),
+    ('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], ['venue_id']),
+    ('ix_venues_city_state', 'venues', ['city', 'state'], ['id', 'name', 'num_upcoming_shows']),
+]
+
+
+def replace_indexes(covering):
+    # Build each new index concurrently under a temporary name, then drop
+    # the old one concurrently and rename the new one, so the tables stay
+    # readable and writable; the rename only locks the index briefly
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(name + '_new', table, columns, unique=False, postgresql_concurrently=True,
+                            postgresql_include=include if covering else [])
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.execute('ALTER INDEX {}_new RENAME TO {}'.format(name, name))
+
+
+def upgrade():
+    # Recreate the show and area indexes with the other columns their pages
+    # read, so the planner answers them with index only scans
+    replace_indexes(covering=True)
+
+
+def downgrade():
+    replace_indexes(covering=False)
@@ -0,0 +1,34 @@
+"""listing keyset indexes  migration
+
+Revision ID: e5b7c2d94f18
+Revises: c6d2a8f41e93
+Create Date: 2026-10-18 21:04:37.118420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c2d94f18'
+down_revision = 'c6d2a8f41e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Indexes in the keyset order of the venues and shows listings, so their
+    # pages are read from the index instead of sorting the whole table. The
+    # venues one also covers the listings of an area, which the city and
+    # state index did. Built concurrently, outside of a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_venues_state_city_id', 'venues', ['state', 'city', 'id'], unique=False, postgresql_concurrently=True, postgresql_include=['name', 'num_upcoming_shows'])
+        op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'], unique=False, postgresql_concurrently=True, postgresql_include=['venue_id', 'artist_id'])
+        op.drop_index('ix_venues_city_state', table_name='venues', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_venues_city_state', 'venues', ['city', 'state'], unique=False, postgresql_concurrently=True, postgresql_include=['id', 'name', 'num_upcoming_shows'])
+        op.drop_index('ix_shows_start_time_id', table_name='shows', postgresql_concurrently=True)
+        op.drop_index('ix_venues_state_city_id', table_name='venues', postgresql_concurrently=True)
@@ -1,38 +1,131 @@
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, ExcludeConstraint, TSRANGE
+
+from replicas import RoutingSession
+
+# Read only views may read from a replica, see replicas.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+
+    id = db.Column(db.SmallInteger, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    # In-process cache of the (id, name) pairs, which rarely change
+    CACHE_TIMEOUT = 300
+    _cache = None
+    _cache_expires = 0
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def cached(cls):
+        with cls._cache_lock:
+            if cls._cache is None or cls._cache_expires < time.monotonic():
+                cls._cache = [(genre.id, genre.name)
+                              for genre in cls.query.order_by(cls.id)]
+                cls._cache_expires = time.monotonic() + cls.CACHE_TIMEOUT
+            return cls._cache
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._cache_lock:
+            cls._cache = None
+
+    @classmethod
+    def choices(cls):
+        return [(name, name) for id, name in cls.cached()]
+
+    @classmethod
+    def names_of(cls, ids):
+        names = dict(cls.cached())
+        return [names[id] for id in ids or [] if id in names]
+
+    @classmethod
+    def ids_of(cls, names):
+        ids = {name: id for id, name in cls.cached()}
+        return [ids[name] for name in names or [] if name in ids]
 
-db = SQLAlchemy()
+    @classmethod
+    def id_of(cls, name):
+        ids = cls.ids_of([name])
+        return ids[0] if ids else None
 
 
-class Venue(db.Model):
+class GenresMixin(object):
+    # Genres are stored as small integer codes of the genres table; the
+    # genres property reads and writes them as names
+
+    @property
+    def genres(self):
+        return Genre.names_of(self.genre_ids)
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_ids = Genre.ids_of(names)
+
+
+class TimestampMixin(object):
+    # Time of the last change of a row, for the HTTP validators of the pages
+    # showing it, see http_cache.py
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           server_default=db.func.now(), onupdate=db.func.now())
+
+
+class Venue(GenresMixin, TimestampMixin, db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        # Covers the venues listing in its keyset order, and of an area
+        db.Index('ix_venues_state_city_id', 'state', 'city', 'id',
+                 postgresql_include=['name', 'num_upcoming_shows']),
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_genre_ids', 'genre_ids', postgresql_using='gin'),
+        db.Index('ix_venues_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    # Required, as a part of the venues listing keyset
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(db.ARRAY(db.String),nullable=False)
+    genre_ids = db.Column(ARRAY(db.SmallInteger), nullable=False, server_default='{}')
     website_link = db.Column(db.String(500))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
 
+    # Denormalized count of upcoming shows, see counters.py
+    num_upcoming_shows = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+
     shows = db.relationship('Show', back_populates="venues")
 
 
-class Artist(db.Model):
+class Artist(GenresMixin, TimestampMixin, db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_genre_ids', 'genre_ids', postgresql_using='gin'),
+        db.Index('ix_artists_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genre_ids = db.Column(ARRAY(db.SmallInteger), nullable=False, server_default='{}')
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
@@ -41,18 +134,47 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
 
+    # Denormalized count of upcoming shows, see counters.py
+    num_upcoming_shows = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+
     shows = db.relationship('Show', back_populates="artists")
 
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
-class Show(db.Model):
+class Show(TimestampMixin, db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        # Cover the shows of a venue page and of an artist page, in order
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time',
+                 postgresql_include=['artist_id']),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time',
+                 postgresql_include=['venue_id']),
+        # Covers the shows listing in its keyset order
+        db.Index('ix_shows_start_time_id', 'start_time', 'id',
+                 postgresql_include=['venue_id', 'artist_id']),
+        db.Index('ix_shows_updated_at', 'updated_at'),
+        # A venue or an artist can not be booked for overlapping shows
+        ExcludeConstraint(('venue_id', '='), ('during', '&&'),
+                          name='shows_venue_id_during_excl', using='gist'),
+        ExcludeConstraint(('artist_id', '='), ('during', '&&'),
+                          name='shows_artist_id_during_excl', using='gist'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     start_time = db.Column(db.DateTime, nullable=False,)
 
+    # Length of the show in minutes
+    duration = db.Column(db.Integer, nullable=False,
+                         default=120, server_default='120')
+
+    # Period booked by the show, computed by Postgres
+    during = db.Column(TSRANGE, db.Computed(
+        'tsrange(start_time, start_time + make_interval(mins => duration))',
+        persisted=True))
+
     venues = db.relationship('Venue', back_populates="shows")
 
     venue_id = db.Column(db.Integer, db.ForeignKey(
@@ -62,3 +184,110 @@ class Show(db.Model):
 
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id'), nullable=False,)
+
+
+class Match(db.Model):
+    # Precomputed recommendation of an artist for a venue and of the venue
+    # for the artist, see matchmaking.py
+    __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_venue_id_score', 'venue_id', 'score'),
+        db.Index('ix_matches_artist_id_score', 'artist_id', 'score'),
+    )
+
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        'venues.id', ondelete='CASCADE'), primary_key=True)
+
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        'artists.id', ondelete='CASCADE'), primary_key=True)
+
+    score = db.Column(db.Integer, nullable=False)
+
+
+class TableVersion(db.Model):
+    # Version of a table, bumped by each statement changing its rows, for the
+    # HTTP validators of the listings showing it, see http_cache.py
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, server_default='0')
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+
+# Tables whose versions are kept
+VERSIONED_TABLES = ('venues', 'artists', 'shows')
+
+# Statement level triggers bump the version of their table once per statement
+# changing rows, in its transaction, so the version changes when the change
+# is committed; the row lock queues the writers of a table until they commit.
+# Inserts, updates and deletes pass their rows as the changed transition
+# table, so statements changing none leave the version as it is.
+BUMP_TABLE_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    -- A truncate has no transition table
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT FROM changed) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    UPDATE table_versions
+    SET version = version + 1,
+        changed_at = greatest(changed_at, clock_timestamp()::timestamp)
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+VERSION_TRIGGERS = [
+    ('insert', 'INSERT', 'REFERENCING NEW TABLE AS changed'),
+    ('update', 'UPDATE', 'REFERENCING NEW TABLE AS changed'),
+    ('delete', 'DELETE', 'REFERENCING OLD TABLE AS changed'),
+    ('truncate', 'TRUNCATE', ''),
+]
+
+
+def create_version_triggers(connection, tables=VERSIONED_TABLES):
+    connection.exec_driver_sql(BUMP_TABLE_VERSION_FUNCTION)
+    for table in tables:
+        connection.exec_driver_sql(
+            'INSERT INTO table_versions (table_name) VALUES (%s) ON CONFLICT DO NOTHING', (table,))
+        for name, event, transition in VERSION_TRIGGERS:
+            connection.exec_driver_sql(
+                'CREATE OR REPLACE TRIGGER {table}_{name}_version AFTER {event} ON {table} {transition} '
+                'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()'.format(
+                    table=table, name=name, event=event, transition=transition))
+
+
+@db.event.listens_for(db.metadata, 'after_create')
+def _create_version_triggers(target, connection, **kwargs):
+    create_version_triggers(connection)
+
+
+class Job(db.Model):
+    # Work done after a write by the background workers, see jobs.py
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Queued jobs in the order the workers of a queue claim them
+        db.Index('ix_jobs_queue_run_at', 'queue', 'run_at',
+                 postgresql_where=db.text("status = 'queued'")),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    queue = db.Column(db.String(64), nullable=False)
+    task = db.Column(db.String(120), nullable=False)
+    payload = db.Column(JSONB, nullable=False, server_default='{}')
+
+    # A job is enqueued once per key, see jobs.enqueue
+    idempotency_key = db.Column(db.String(200), unique=True)
+
+    # queued, running, done or failed
+    status = db.Column(db.String(16), nullable=False, server_default='queued')
+    attempts = db.Column(db.Integer, nullable=False, server_default='0')
+    max_attempts = db.Column(db.Integer, nullable=False, server_default='5')
+    run_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    locked_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
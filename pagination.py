@@ -0,0 +1,127 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Cursors.
+#----------------------------------------------------------------------------#
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(direction, values):
+    # Opaque cursor holding the paging direction and the keyset values of a row
+    payload = json.dumps([direction, [_encode_value(value) for value in values]])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def _valid_value(value, column):
+    # A keyset value of the column's type, or None if the column is nullable
+    if value is None:
+        return column.expression.nullable
+    python_type = column.type.python_type
+    return isinstance(value, python_type) and (python_type is bool or not isinstance(value, bool))
+
+
+def decode_cursor(cursor, columns):
+    # Returns (direction, values) for the keyset columns; a missing cursor
+    # means the first page
+    if not cursor:
+        return 'next', None
+
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        direction, values = json.loads(payload.decode('utf-8'))
+        values = tuple(_decode_value(value) for value in values)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        abort(400)
+
+    if direction not in ('next', 'prev') or len(values) != len(columns) or not all(
+            _valid_value(value, column) for value, column in zip(values, columns)):
+        abort(400)
+
+    return direction, values
+
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+
+class Page(object):
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def cursors(self):
+        # Cursors of the neighbouring pages, as cached with the listings and
+        # returned by the API
+        return {'next_cursor': self.next_cursor, 'prev_cursor': self.prev_cursor}
+
+
+def page_size(limit, default, maximum):
+    # Clamp the requested page size to 1..maximum
+    try:
+        limit = int(limit) if limit else default
+    except ValueError:
+        abort(400)
+    return max(1, min(limit, maximum))
+
+
+def paginate(query, columns, key, cursor=None, limit=30):
+    # Page of query rows ordered by the unique keyset columns. key maps a row
+    # to its values for those columns, which become the next/prev cursors.
+    direction, values = decode_cursor(cursor, columns)
+    keyset = tuple_(*columns)
+
+    if direction == 'next':
+        if values is not None:
+            query = query.filter(keyset > values)
+        query = query.order_by(*columns)
+    else:
+        query = query.filter(keyset < values).order_by(
+            *[column.desc() for column in columns])
+
+    # Fetch one extra row to know whether there is another page
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == 'next':
+        has_next, has_prev = has_more, values is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    if not rows:
+        return Page(rows)
+
+    return Page(
+        rows,
+        next_cursor=encode_cursor('next', key(rows[-1])) if has_next else None,
+        prev_cursor=encode_cursor('prev', key(rows[0])) if has_prev else None,
+    )
+
+
+def paginate_request(query, columns, key):
+    # Paginate with the cursor and limit arguments of the current request
+    limit = page_size(request.args.get('limit'),
+                      current_app.config['PAGE_SIZE'],
+                      current_app.config['MAX_PAGE_SIZE'])
+    return paginate(query, columns, key, request.args.get('cursor'), limit)
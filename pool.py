@@ -0,0 +1,172 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import has_request_context
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds in milliseconds of the checkout latency histogram buckets
+CHECKOUT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats(object):
+    # Counters of one connection pool of this worker: checkout latency
+    # histogram, connections in use, timeouts and connection churn.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.histogram = [0] * (len(CHECKOUT_BUCKETS) + 1)
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.histogram[bisect_left(CHECKOUT_BUCKETS, seconds * 1000)] += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use -= 1
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self, pool=None):
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                # Checkouts by wait, up to each bound; the last has no bound
+                'checkout_latency_ms': [
+                    {'le': bound, 'count': count}
+                    for bound, count in zip(CHECKOUT_BUCKETS + (None,), self.histogram)
+                ],
+            }
+
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool with counters of its own, timing how long each checkout waits
+    # for a free connection, including the ones that give up after
+    # pool_timeout
+
+    def __init__(self, creator, **kwargs):
+        super(InstrumentedQueuePool, self).__init__(creator, **kwargs)
+        self.stats = PoolStats()
+        # A recreated pool gets the listeners of the one it replaces, and
+        # its counters from recreate()
+        if kwargs.get('_dispatch') is None:
+            for name in ('checkout', 'checkin', 'connect', 'invalidate'):
+                event.listen(self, name, getattr(self.stats, 'on_' + name))
+
+    def recreate(self):
+        # Pools are recreated when their engine is disposed, e.g. after a fork
+        pool = super(InstrumentedQueuePool, self).recreate()
+        pool.stats = self.stats
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super(InstrumentedQueuePool, self).connect()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class EnginePoolStats(object):
+    # Pool counters of each engine of the app, the primary and each replica
+    # apart; the replica health checks use the pools of the replicas
+
+    def init_app(self, app):
+        # Use the instrumented pool for the engines of the app; must run
+        # before the replica binds are added and the engines are created by
+        # db.init_app
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        options.setdefault('poolclass', InstrumentedQueuePool)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    def stats(self, engines):
+        # Stats of the instrumented pools, by bind key; the default bind is
+        # the primary
+        return {key or 'primary': engine.pool.stats.stats(engine.pool)
+                for key, engine in engines.items()
+                if isinstance(engine.pool, InstrumentedQueuePool)}
+
+
+pool_stats = EnginePoolStats()
+
+#----------------------------------------------------------------------------#
+# Statement timeout.
+#----------------------------------------------------------------------------#
+
+
+class StatementTimeout(object):
+    # Cancels the statements of web requests running longer than
+    # DB_STATEMENT_TIMEOUT milliseconds. CLI commands and job workers, which
+    # refresh, import or export whole tables, run theirs to completion. The
+    # setting stays on the pooled connection, so it is only changed when a
+    # connection goes from one to the other.
+
+    def __init__(self):
+        self.timeout = None
+
+    def init_app(self, app):
+        # Watch the checkouts of the Postgres engines; must run after
+        # db.init_app, which creates them
+        self.timeout = app.config.get('DB_STATEMENT_TIMEOUT')
+        with app.app_context():
+            for engine in app.extensions['sqlalchemy'].engines.values():
+                if engine.dialect.name == 'postgresql':
+                    event.listen(engine.pool, 'checkout', self.checkout)
+
+    def checkout(self, dbapi_connection, connection_record, connection_proxy):
+        timeout = self.timeout if has_request_context() else None
+        if connection_record.info.get('statement_timeout') == timeout:
+            return
+
+        cursor = dbapi_connection.cursor()
+        try:
+            if timeout:
+                cursor.execute('SET statement_timeout = {:d}'.format(timeout))
+            else:
+                cursor.execute('RESET statement_timeout')
+        finally:
+            cursor.close()
+        dbapi_connection.commit()
+        connection_record.info['statement_timeout'] = timeout
+
+
+statement_timeout = StatementTimeout()
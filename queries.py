@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Longest repr of the parameters of a slow query written to the log
+SLOW_QUERY_PARAMETERS_LENGTH = 1000
+
+
+class QueryRecorder(object):
+    # Number, total time and slowest of the queries run while it is active
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        if duration >= self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+
+
+# Recorders active in each thread; queries are recorded by all of them
+_local = threading.local()
+
+
+def active_recorders():
+    if not hasattr(_local, 'recorders'):
+        _local.recorders = []
+    return _local.recorders
+
+
+@contextmanager
+def record_queries():
+    # Record the queries run by the current thread inside the block, e.g. to
+    # hold a route to a query budget:
+    #
+    #     with record_queries() as queries:
+    #         client.get('/artists')
+    #     assert queries.count <= 2
+    recorder = QueryRecorder()
+    recorders = active_recorders()
+    recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        recorders.remove(recorder)
+
+
+#----------------------------------------------------------------------------#
+# Engine events.
+#----------------------------------------------------------------------------#
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+
+    for recorder in active_recorders():
+        recorder.record(statement, duration)
+
+    if has_app_context():
+        threshold = current_app.config.get('SLOW_QUERY_MS')
+        if threshold is not None and duration * 1000 >= threshold:
+            current_app.logger.warning(
+                'Slow query (%.1f ms): %s; parameters: %s', duration * 1000, statement,
+                repr(parameters)[:SLOW_QUERY_PARAMETERS_LENGTH])
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+#----------------------------------------------------------------------------#
+# Requests.
+#----------------------------------------------------------------------------#
+
+
+class QueryLog(object):
+    # Records the queries of each request, reports them in a Server-Timing
+    # header and logs one line per request with their count and time
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.teardown_request(self.teardown_request)
+
+    def start_request(self):
+        g.query_recorder = QueryRecorder()
+        active_recorders().append(g.query_recorder)
+
+    def finish_request(self, response):
+        recorder = g.get('query_recorder')
+        if recorder is None:
+            return response
+
+        response.headers.add('Server-Timing', 'db;dur={:.1f};desc="{} queries"'.format(
+            recorder.duration * 1000, recorder.count))
+        response.headers.add('Server-Timing', 'db-slowest;dur={:.1f}'.format(
+            recorder.slowest_duration * 1000))
+
+        current_app.logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 1),
+            'slowest_ms': round(recorder.slowest_duration * 1000, 1),
+            'slowest': recorder.slowest_statement,
+        }))
+
+        return response
+
+    def teardown_request(self, error=None):
+        recorder = g.pop('query_recorder', None)
+        if recorder is not None and recorder in active_recorders():
+            active_recorders().remove(recorder)
+
+
+query_log = QueryLog()
@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Replication lag of a Postgres standby in seconds; a standby that has
+# replayed all it received is not lagging, however old its last transaction
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+          OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RoutingSession(Session):
+    # Session reading from the replica chosen for the request, if any. Flushes
+    # and INSERT/UPDATE/DELETE statements always go to the primary.
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase):
+            replica = g.get('replica') if has_request_context() else None
+            if replica is not None:
+                return self._db.engines[replica]
+
+        return super(RoutingSession, self).get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def after_commit(db_session):
+    # Remember the write so the next reads of the client see it
+    if has_request_context():
+        g.wrote = True
+
+
+class ReplicaRouter(object):
+    # Chooses a healthy replica for read only views. Replicas are checked
+    # every REPLICA_CHECK_INTERVAL seconds on a background thread, so no
+    # request waits on a replica that does not answer; ones that fail or lag
+    # more than REPLICA_MAX_LAG_SECONDS are skipped, and reads fall back to
+    # the primary when none is left or the checks have stopped.
+
+    def __init__(self):
+        self.app = None
+        self.replicas = []
+        self.status = {}
+        self.checked_at = 0.0
+        self._pid = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        # Add the replicas as binds of the app, with the engine options of
+        # the primary; must run before db.init_app
+        self.app = app
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        self.replicas = []
+
+        for number, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS', [])):
+            key = 'replica_{}'.format(number)
+            binds[key] = dict(options, url=uri)
+            if make_url(uri).get_backend_name() == 'postgresql':
+                binds[key]['connect_args'] = dict(
+                    options.get('connect_args', {}),
+                    connect_timeout=app.config['REPLICA_CONNECT_TIMEOUT'])
+            self.replicas.append(key)
+
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.after_request(self.remember_write)
+
+    def check(self):
+        # Health and lag of each replica, by key
+        engines = current_app.extensions['sqlalchemy'].engines
+        max_lag = current_app.config['REPLICA_MAX_LAG_SECONDS']
+        status = {}
+
+        for key in self.replicas:
+            engine = engines[key]
+            try:
+                with engine.connect() as connection:
+                    if engine.dialect.name == 'postgresql':
+                        lag = float(connection.exec_driver_sql(REPLICA_LAG_QUERY).scalar())
+                    else:
+                        connection.exec_driver_sql('SELECT 1')
+                        lag = 0.0
+            except Exception as e:
+                current_app.logger.warning('Replica %s is unavailable: %s', key, e)
+                status[key] = {'healthy': False, 'lag': None}
+                continue
+
+            if lag > max_lag:
+                current_app.logger.warning('Replica %s lags %.1f seconds', key, lag)
+            status[key] = {'healthy': lag <= max_lag, 'lag': lag}
+
+        return status
+
+    def refresh(self):
+        self.status = self.check()
+        self.checked_at = time.monotonic()
+
+    def watch(self):
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    self.refresh()
+                except Exception:
+                    current_app.logger.exception('Could not check the replicas')
+                self._stopping.wait(current_app.config['REPLICA_CHECK_INTERVAL'])
+
+    def start(self):
+        # The checks start on first use in each process, after the server
+        # has forked its workers
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.watch, name='replica-checks', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._pid = self._thread = None
+
+    def choose(self):
+        # Key of a healthy replica, or None to read from the primary
+        if not self.replicas:
+            return None
+        self.start()
+
+        # Replicas are not trusted on a status older than a few checks
+        if time.monotonic() - self.checked_at > 3 * current_app.config['REPLICA_CHECK_INTERVAL']:
+            return None
+
+        healthy = [key for key in self.replicas if self.status.get(key, {}).get('healthy')]
+        return random.choice(healthy) if healthy else None
+
+    def remember_write(self, response):
+        # Reads of a client that just wrote go to the primary for a while,
+        # so it does not miss its own changes on a lagging replica
+        if g.get('wrote'):
+            session['primary_until'] = time.time() + current_app.config['READ_AFTER_WRITE_SECONDS']
+        return response
+
+    def stats(self):
+        return {'replicas': self.replicas, 'status': self.status}
+
+
+replica_router = ReplicaRouter()
+
+
+def read_replica(view):
+    # Run a read only view against a replica, unless the client wrote recently
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('primary_until', 0) < time.time():
+            g.replica = replica_router.choose()
+        return view(*args, **kwargs)
+
+    return wrapper
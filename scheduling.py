@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+from counters import add_upcoming_shows
+from forms import ShowForm
+from importer import validate_row
+from models import db, Venue, Artist, Show
+
+# Most shows booked by one batch
+BATCH_MAX_SHOWS = 1000
+
+# Exclusion constraints rejecting the double bookings of a venue or an artist
+BOOKING_CONSTRAINTS = ('shows_venue_id_during_excl', 'shows_artist_id_during_excl')
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#----------------------------------------------------------------------------#
+
+
+def show_end_time(start_time, duration):
+    return start_time + timedelta(minutes=duration)
+
+
+def is_double_booking(error):
+    # Whether an IntegrityError was raised by the booking constraints, e.g.
+    # for a show booked by another request after the conflicts were checked
+    return getattr(error.orig.diag, 'constraint_name', None) in BOOKING_CONSTRAINTS
+
+
+def find_conflicts(venue_id, artist_id, start_time, duration):
+    # Shows of the venue or of the artist overlapping the given period. The
+    # overlap test uses the GiST indexes of the shows exclusion constraints,
+    # which reject such double bookings on insert anyway.
+    period = db.func.tsrange(start_time, show_end_time(start_time, duration))
+
+    return Show.query.filter(
+        db.or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+        Show.during.op('&&')(period)
+    ).order_by(Show.start_time).all()
+
+
+#----------------------------------------------------------------------------#
+# Batch booking.
+#----------------------------------------------------------------------------#
+
+# A batch is a list of (line number, values) of shows, checked as a whole:
+# one query for the artists and venues it references and one for the
+# booked shows it overlaps, instead of a few queries per show.
+
+
+def add_error(errors, line_num, field, message):
+    errors.setdefault(line_num, {}).setdefault(field, []).append(message)
+
+
+def check_references(shows, errors):
+    # Shows referencing an artist or a venue that does not exist
+    artist_ids = {values['artist_id'] for line_num, values in shows}
+    venue_ids = {values['venue_id'] for line_num, values in shows}
+
+    found = db.session.execute(db.union_all(
+        db.select(db.literal('artist_id'), Artist.id).where(Artist.id.in_(artist_ids)),
+        db.select(db.literal('venue_id'), Venue.id).where(Venue.id.in_(venue_ids))
+    )).all()
+    found = set(map(tuple, found))
+
+    for line_num, values in shows:
+        for field in ('artist_id', 'venue_id'):
+            if (field, values[field]) not in found:
+                add_error(errors, line_num, field, 'No {} with id {}'.format(
+                    field.split('_')[0], values[field]))
+
+
+def check_batch_overlaps(shows, errors):
+    # Shows of the batch overlapping each other at the same venue or with
+    # the same artist, found by sorting instead of comparing every pair
+    for key in ('venue_id', 'artist_id'):
+        ordered = sorted(shows, key=lambda show: (show[1][key], show[1]['start_time']))
+        latest = None
+
+        for line_num, values in ordered:
+            end_time = show_end_time(values['start_time'], values['duration'])
+            if latest is not None and latest[1][key] == values[key] and values['start_time'] < latest[2]:
+                add_error(errors, line_num, 'start_time',
+                          'Overlaps the show of line {}.'.format(latest[0]))
+            # Keep the show ending last of the group, which later ones may overlap
+            if latest is None or latest[1][key] != values[key] or end_time > latest[2]:
+                latest = (line_num, values, end_time)
+
+
+def check_booked_overlaps(shows, errors):
+    # Shows of the batch overlapping booked shows of their venue or artist,
+    # joining the batch as a VALUES list to the shows through the GiST
+    # indexes of the exclusion constraints
+    batch = db.select(db.values(
+        db.column('line_num', db.Integer),
+        db.column('venue_id', db.Integer),
+        db.column('artist_id', db.Integer),
+        db.column('start_time', db.DateTime),
+        db.column('end_time', db.DateTime),
+        name='batch'
+    ).data([
+        (line_num, values['venue_id'], values['artist_id'], values['start_time'],
+         show_end_time(values['start_time'], values['duration']))
+        for line_num, values in shows
+    ])).cte('batch')
+    period = db.func.tsrange(batch.c.start_time, batch.c.end_time)
+
+    conflicts = db.session.execute(db.union(*[
+        db.select(batch.c.line_num, Show.id, Show.start_time).join(
+            Show, db.and_(show_key == batch_key, Show.during.op('&&')(period)))
+        for show_key, batch_key in ((Show.venue_id, batch.c.venue_id),
+                                    (Show.artist_id, batch.c.artist_id))
+    ])).all()
+
+    for line_num, show_id, start_time in sorted(conflicts):
+        add_error(errors, line_num, 'start_time',
+                  'The venue or the artist is already booked for show {} at {}.'.format(show_id, start_time))
+
+
+def validate_show_batch(rows):
+    # Validate (line number, row) pairs with the rules of the show form, then
+    # check the valid ones as a batch. Returns (shows, errors), errors being
+    # {line number: {field: [messages]}}; shows can be booked if it is empty.
+    shows = []
+    errors = {}
+
+    for line_num, row in rows:
+        values, row_errors = validate_row(ShowForm, row)
+        if row_errors:
+            errors[line_num] = row_errors
+        else:
+            shows.append((line_num, values))
+
+    if shows:
+        check_references(shows, errors)
+        check_batch_overlaps(shows, errors)
+        check_booked_overlaps(shows, errors)
+
+    return shows, errors
+
+
+def book_shows(shows):
+    # Insert the shows of a valid batch with one executemany in the caller's
+    # transaction, and count the upcoming ones. The exclusion constraints
+    # still reject shows overlapping ones booked since the validation.
+    values = [values for line_num, values in shows]
+    db.session.execute(Show.__table__.insert(), values)
+    add_upcoming_shows(values)
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from cache import cache
+from counters import refresh_upcoming_show_counters
+from jobs import task, enqueue, enqueue_many
+from matchmaking import refresh_matches
+from thumbnails import thumbnails, UnsafeURLError
+
+#----------------------------------------------------------------------------#
+# Tasks.
+#----------------------------------------------------------------------------#
+
+
+@task('thumbnails.warm', queue='thumbnails')
+def warm_thumbnails(url):
+    # Make the thumbnails of a new image link before its pages are visited
+    for size in thumbnails.sizes:
+        if os.path.exists(thumbnails.path(size, url)):
+            continue
+        try:
+            thumbnails.store(size, url)
+        except UnsafeURLError:
+            # Never proxied, retrying would not help
+            return
+
+
+@task('matches.refresh')
+def refresh_matches_task():
+    refresh_matches(current_app.config['MATCHES_LIMIT'])
+
+
+@task('counters.refresh')
+def refresh_counters_task(since=None, until=None):
+    # Recount the venues and artists of the shows started in a window, see
+    # enqueue_counters_refresh, or all of them
+    if since is not None:
+        since, until = datetime.fromisoformat(since), datetime.fromisoformat(until)
+    if refresh_upcoming_show_counters(since, until):
+        cache.invalidate('venues', 'artists')
+
+#----------------------------------------------------------------------------#
+# Enqueueing.
+#----------------------------------------------------------------------------#
+
+# Helpers for the write handlers; the jobs are added to the handler's
+# transaction and committed with it.
+
+
+def enqueue_thumbnails(image_link):
+    if image_link:
+        key = 'thumbnails.warm:' + hashlib.sha1(image_link.encode('utf-8')).hexdigest()
+        enqueue('thumbnails.warm', {'url': image_link}, key=key)
+
+
+def enqueue_matches_refresh():
+    # One refresh at the end of each MATCHES_REFRESH_DELAY window covers all
+    # the venue and artist writes of the window
+    delay = current_app.config['MATCHES_REFRESH_DELAY']
+    window_end = (int(time.time()) // delay + 1) * delay
+    enqueue('matches.refresh', key='matches.refresh:{}'.format(window_end),
+            run_at=datetime.fromtimestamp(window_end))
+
+
+def enqueue_counters_refresh(*start_times):
+    # The upcoming shows counters drift when a show starts. One refresh at
+    # the end of each COUNTERS_REFRESH_WINDOW recounts the venues and artists
+    # of all the shows starting in the window.
+    window = current_app.config['COUNTERS_REFRESH_WINDOW']
+    window_ends = sorted({(int(start_time.timestamp()) // window + 1) * window
+                          for start_time in start_times if start_time > datetime.now()})
+    if window_ends:
+        enqueue_many('counters.refresh', [
+            ({'since': datetime.fromtimestamp(window_end - window).isoformat(),
+              'until': datetime.fromtimestamp(window_end).isoformat()},
+             'counters.refresh:{}'.format(window_end), datetime.fromtimestamp(window_end))
+            for window_end in window_ends])
@@ -0,0 +1,73 @@
+from counters import refresh_upcoming_show_counters
+from models import db, Genre
+
+# Schema and data of the tests and benchmarks, in the database the app was
+# configured with
+
+GENRES = ['Blues', 'Classical', 'Folk', 'Jazz', 'Rock n Roll']
+STATES = ['CA', 'IL', 'NY', 'TX', 'WA']
+
+# Large catalogues are generated by Postgres. Show n is booked every
+# SHOW_INTERVAL from a start chosen so half of the shows are upcoming; no
+# two shows overlap, whatever their venue and artist.
+SEED_VENUES_QUERY = db.text("""
+    INSERT INTO venues (name, city, state, address, phone, image_link, genre_ids,
+                        seeking_talent, seeking_description)
+    SELECT 'Venue ' || n, 'City ' || n % :cities, (CAST(:states AS varchar[]))[n % 5 + 1],
+           n || ' Main Street', '555-' || lpad((n % 10000)::text, 4, '0'),
+           'https://images.example.com/venues/' || n || '.jpg',
+           ARRAY[n % 5 + 1, (n / 5) % 5 + 1]::smallint[], n % 3 = 0,
+           CASE WHEN n % 3 = 0 THEN 'Looking for local bands' END
+    FROM generate_series(1, :count) AS n
+""")
+
+SEED_ARTISTS_QUERY = db.text("""
+    INSERT INTO artists (name, city, state, phone, image_link, genre_ids,
+                         seeking_venue, seeking_description)
+    SELECT 'Artist ' || n, 'City ' || n % :cities, (CAST(:states AS varchar[]))[n % 5 + 1],
+           '555-' || lpad((n % 10000)::text, 4, '0'),
+           'https://images.example.com/artists/' || n || '.jpg',
+           ARRAY[n % 5 + 1]::smallint[], n % 4 = 0,
+           CASE WHEN n % 4 = 0 THEN 'Looking for a stage' END
+    FROM generate_series(1, :count) AS n
+""")
+
+SEED_SHOWS_QUERY = db.text("""
+    INSERT INTO shows (venue_id, artist_id, start_time)
+    SELECT n % :venues + 1, n % :artists + 1,
+           date_trunc('hour', localtimestamp) + (n - :count / 2) * interval '3 hours'
+    FROM generate_series(0, :count - 1) AS n
+""")
+
+
+def create_schema(engine=None):
+    # Tables of the models, dropped first, with the genres seeded; in the
+    # primary unless another engine is given
+    with (engine or db.engine).begin() as connection:
+        connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        db.metadata.drop_all(connection)
+        db.metadata.create_all(connection)
+        connection.execute(db.insert(Genre), [{'name': name} for name in GENRES])
+    Genre.clear_cache()
+
+
+def empty_tables(engine=None):
+    with (engine or db.engine).begin() as connection:
+        connection.exec_driver_sql(
+            'TRUNCATE venues, artists, shows, matches, jobs RESTART IDENTITY CASCADE')
+
+
+def seed_catalogue(venues, artists, shows, cities=100):
+    # Generated venues, artists and shows with their upcoming shows counters,
+    # analyzed so the planner sees their real size
+    empty_tables()
+    db.session.execute(SEED_VENUES_QUERY, {'count': venues, 'cities': cities, 'states': STATES})
+    db.session.execute(SEED_ARTISTS_QUERY, {'count': artists, 'cities': cities, 'states': STATES})
+    if shows:
+        db.session.execute(SEED_SHOWS_QUERY, {'count': shows, 'venues': venues, 'artists': artists})
+    db.session.commit()
+    refresh_upcoming_show_counters()
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM ANALYZE venues, artists, shows')
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.engine import make_url
+
+# Tests needing a database run against TEST_DATABASE_URL, whose tables they
+# drop, create and empty; they are skipped when it is not set. The replica
+# stand-in is a second database next to it, named with a _replica suffix.
+# The config is read when app is imported, so the environment is set first.
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL or 'postgresql+psycopg://localhost/fyyur_test'
+REPLICA_URL = make_url(os.environ['DATABASE_URL'])
+REPLICA_URL = REPLICA_URL.set(database=REPLICA_URL.database + '_replica')
+os.environ['DATABASE_REPLICA_URLS'] = REPLICA_URL.render_as_string(hide_password=False)
+os.environ['CACHE_TYPE'] = 'null'
+
+from app import app as fyyur_app  # noqa: E402
+from models import db, Venue, Artist, Show  # noqa: E402
+from replicas import replica_router  # noqa: E402
+from tests.catalogue import create_schema, empty_tables  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+
+    with fyyur_app.app_context():
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            if not connection.exec_driver_sql(
+                    'SELECT 1 FROM pg_database WHERE datname = %(name)s',
+                    {'name': REPLICA_URL.database}).scalar():
+                connection.exec_driver_sql('CREATE DATABASE "{}"'.format(REPLICA_URL.database))
+
+        create_schema()
+        create_schema(db.engines['replica_0'])
+
+
+@pytest.fixture
+def app(database, monkeypatch):
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    # Reads go to the primary, except in the tests of the replicas
+    monkeypatch.setattr(replica_router, 'start', lambda: None)
+    yield fyyur_app
+
+    with fyyur_app.app_context():
+        db.session.remove()
+        empty_tables()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def catalogue(app):
+    # Two venues and two artists, each with a past and an upcoming show
+    now = datetime.now().replace(microsecond=0)
+
+    with app.app_context():
+        venues = [
+            Venue(name='The Musical Hop', city='San Francisco', state='CA',
+                  genres=['Jazz', 'Folk'], seeking_talent=True),
+            Venue(name='Park Square Live Music & Coffee', city='San Francisco', state='CA',
+                  genres=['Rock n Roll', 'Jazz'], seeking_talent=False),
+        ]
+        artists = [
+            Artist(name='Guns N Petals', city='San Francisco', state='CA',
+                   genres=['Rock n Roll'], seeking_venue=True),
+            Artist(name='The Wild Sax Band', city='San Francisco', state='CA',
+                   genres=['Jazz', 'Classical'], seeking_venue=False),
+        ]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+
+        for number, (venue, artist) in enumerate(zip(venues, artists)):
+            db.session.add_all([
+                Show(venue_id=venue.id, artist_id=artist.id,
+                     start_time=now - timedelta(days=10 + number)),
+                Show(venue_id=venue.id, artist_id=artist.id,
+                     start_time=now + timedelta(days=10 + number)),
+            ])
+            venue.num_upcoming_shows = artist.num_upcoming_shows = 1
+        db.session.commit()
+
+        return {'venues': [venue.id for venue in venues],
+                'artists': [artist.id for artist in artists]}
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import os
+import shutil
+
+import pytest
+from flask import Flask, render_template_string
+
+import assets as assets_module
+from app import app as fyyur_app
+from assets import Assets, BUNDLES, DIST_MAX_AGE, MANIFEST_FILE, build_assets
+
+
+def copy_sources(folder):
+    # The sources of the bundles and images, without any previous build
+    shutil.copytree(fyyur_app.static_folder, str(folder),
+                    ignore=shutil.ignore_patterns('dist', 'fonts'))
+    return str(folder)
+
+
+@pytest.fixture(scope='module')
+def static_folder(tmp_path_factory):
+    return copy_sources(tmp_path_factory.mktemp('assets') / 'static')
+
+
+@pytest.fixture(scope='module')
+def built(static_folder):
+    # Encoding the images takes a while, so the tests share a build
+    manifest, notes = build_assets(static_folder)
+    return manifest
+
+
+@pytest.fixture
+def bundles_only(monkeypatch):
+    monkeypatch.setattr(assets_module, 'IMAGES', {})
+
+
+def assets_app(static_folder):
+    app = Flask(__name__, static_folder=static_folder)
+    extension = Assets(app)
+    return app, extension
+
+
+def test_bundles_are_fingerprinted_by_content(static_folder, built):
+    dist_folder = os.path.join(static_folder, 'dist')
+    assert set(built['files']) == set(BUNDLES)
+
+    for name, filename in built['files'].items():
+        base, extension = os.path.splitext(name)
+        with open(os.path.join(dist_folder, filename), 'rb') as f:
+            data = f.read()
+        assert filename == '{}.{}{}'.format(base, hashlib.sha256(data).hexdigest()[:12], extension)
+        with open(os.path.join(dist_folder, filename + '.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == data
+
+
+
+def test_changed_sources_change_the_name(tmp_path, built, bundles_only):
+    static_folder = copy_sources(tmp_path / 'static')
+    # The same sources build the same names
+    assert build_assets(static_folder)[0]['files'] == built['files']
+
+    with open(os.path.join(static_folder, 'css', 'main.css'), 'a', encoding='utf-8') as f:
+        f.write('\n.changed { color: red; }\n')
+
+    files = build_assets(static_folder)[0]['files']
+    assert files['main.css'] != built['files']['main.css']
+    assert files['main.js'] == built['files']['main.js']
+
+
+def test_templates_load_the_built_files(static_folder, built):
+    app, extension = assets_app(static_folder)
+
+    with app.test_request_context():
+        assert extension.asset_urls('main.css') == ['/static/dist/' + built['files']['main.css']]
+        assert render_template_string("{{ asset_urls('head.js')|join(' ') }}") == (
+            '/static/dist/' + built['files']['head.js'])
+
+
+def test_templates_load_the_sources_without_a_build(tmp_path):
+    app, extension = assets_app(str(tmp_path / 'static'))
+
+    with app.test_request_context():
+        assert extension.asset_urls('main.js') == ['/static/' + source for source in BUNDLES['main.js']]
+        assert extension.image_url('img/front-splash.jpg') == '/static/img/front-splash.jpg'
+        assert extension.image_srcset('img/front-splash.jpg', 'webp') == ''
+
+
+def test_images_are_resized_and_fingerprinted(static_folder, built):
+    pytest.importorskip('PIL')
+    app, extension = assets_app(static_folder)
+    variants = built['images']['img/front-splash.jpg']['jpeg']
+
+    assert [width for width, filename in variants] == sorted(width for width, filename in variants)
+    with app.test_request_context():
+        assert extension.image_url('img/front-splash.jpg') == '/static/dist/' + variants[-1][1]
+        assert extension.image_srcset('img/front-splash.jpg', 'jpeg') == ', '.join(
+            '/static/dist/{} {}w'.format(filename, width) for width, filename in variants)
+
+
+def test_built_files_are_immutable(static_folder, built):
+    app, extension = assets_app(static_folder)
+    client = app.test_client()
+    filename = built['files']['main.css']
+
+    response = client.get('/static/dist/' + filename)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == DIST_MAX_AGE
+    assert response.content_encoding is None
+    response.close()
+
+    response = client.get('/static/dist/' + filename, headers={'Accept-Encoding': 'gzip'})
+    assert response.content_encoding == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.vary
+    response.close()
+
+
+def test_the_manifest_is_revalidated(static_folder, built):
+    app, extension = assets_app(static_folder)
+
+    response = app.test_client().get('/static/dist/' + MANIFEST_FILE)
+    assert response.status_code == 200
+    assert response.get_json() == built
+    assert not response.cache_control.immutable
+    assert not response.cache_control.max_age
+    response.close()
@@ -0,0 +1,15 @@
+def test_open_venues_of_an_artist(client, catalogue):
+    response = client.get('/artists/2/availability?start=2030-01-01&end=2030-01-03')
+
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'The Musical Hop' in page
+    assert 'Park Square Live Music &amp; Coffee' not in page
+
+
+def test_availability_defaults_to_the_next_days(client, catalogue):
+    assert client.get('/artists/2/availability').status_code == 200
+
+    response = client.get('/artists/2/availability?start=soon')
+    assert response.status_code == 200
+    assert 'Dates must be formatted as YYYY-MM-DD.' in response.get_data(as_text=True)
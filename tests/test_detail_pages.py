@@ -0,0 +1,33 @@
+from queries import record_queries
+
+# Queries of a detail page: version of the page, the entity, its shows and
+# its recommendations. The genre names are cached per process.
+DETAIL_PAGE_QUERIES = 4
+
+
+def test_venue_page_queries(client, catalogue):
+    venue_id = catalogue['venues'][0]
+    client.get('/venues/{}'.format(venue_id))
+
+    with record_queries() as queries:
+        response = client.get('/venues/{}'.format(venue_id))
+
+    assert response.status_code == 200
+    assert b'Guns N Petals' in response.data
+    assert queries.count == DETAIL_PAGE_QUERIES
+
+
+def test_artist_page_queries(client, catalogue):
+    artist_id = catalogue['artists'][1]
+    client.get('/artists/{}'.format(artist_id))
+
+    with record_queries() as queries:
+        response = client.get('/artists/{}'.format(artist_id))
+
+    assert response.status_code == 200
+    assert b'Park Square Live Music &amp; Coffee' in response.data
+    assert queries.count == DETAIL_PAGE_QUERIES
+
+
+def test_missing_venue_page(client, catalogue):
+    assert client.get('/venues/999').status_code == 404
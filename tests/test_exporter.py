@@ -0,0 +1,68 @@
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+
+from models import db, Venue
+
+
+def backdate(venue_id, hours):
+    db.session.execute(db.update(Venue).where(Venue.id == venue_id).values(
+        updated_at=datetime.now() - timedelta(hours=hours)))
+    db.session.commit()
+
+
+def export(app, directory):
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=[
+            'export', str(directory), '--table', 'venues', '--incremental'])
+    assert result.exit_code == 0, result.output
+
+    with open(os.path.join(directory, 'export_state.json'), encoding='utf-8') as f:
+        state = json.load(f)
+    return result.output, state['venues']
+
+
+def exported_names(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row['name'] for row in csv.DictReader(f)]
+
+
+def test_incremental_export_follows_updated_at(app, catalogue, tmp_path):
+    with app.app_context():
+        backdate(1, 3)
+        backdate(2, 2)
+
+    output, position = export(app, tmp_path)
+    assert 'venues: 2 rows written' in output
+    assert position['id'] == 2
+
+    # An older venue changed since, and a venue added too recently to be settled
+    with app.app_context():
+        venue = db.session.get(Venue, 1)
+        venue.name = 'The Musical Hop Reopened'
+        db.session.commit()
+        backdate(1, 1)
+        db.session.add(Venue(name='Brand New Hall', city='Oakland', state='CA'))
+        db.session.commit()
+
+    output, next_position = export(app, tmp_path)
+    assert 'venues: 1 rows written' in output
+    assert next_position['id'] == 1 and next_position['updated_at'] > position['updated_at']
+
+    filename = 'venues.after-{:%Y%m%dT%H%M%S}-2.csv'.format(
+        datetime.fromisoformat(position['updated_at']))
+    assert exported_names(tmp_path / filename) == ['The Musical Hop Reopened']
+
+
+def test_incremental_export_from_an_id_position(app, catalogue, tmp_path):
+    with app.app_context():
+        backdate(1, 2)
+        backdate(2, 3)
+    (tmp_path / 'export_state.json').write_text(json.dumps({'venues': 1}), encoding='utf-8')
+
+    output, position = export(app, tmp_path)
+
+    assert 'venues: 1 rows written' in output
+    assert exported_names(tmp_path / 'venues.after-1.csv') == ['Park Square Live Music & Coffee']
+    assert position['id'] == 2
@@ -0,0 +1,38 @@
+from facets import count_facets
+from models import db, Venue, Artist
+
+
+def counts(facets):
+    return {facet: {item['label']: item['count'] for item in items}
+            for facet, items in facets.items()}
+
+
+def test_venue_facet_counts(app, catalogue):
+    with app.app_context():
+        # Repeated genre codes count once
+        db.session.add(Venue(name='The Dueling Pianos Bar', city='New York', state='NY',
+                             genre_ids=[1, 1], seeking_talent=False))
+        db.session.commit()
+
+        assert counts(count_facets(Venue, {})) == {
+            'state': {'CA': 2, 'NY': 1},
+            'city': {'San Francisco, CA': 2, 'New York, NY': 1},
+            'genre': {'Blues': 1, 'Folk': 1, 'Jazz': 2, 'Rock n Roll': 1},
+            'seeking': {'Seeking talent': 1, 'Not seeking talent': 2},
+        }
+        assert counts(count_facets(Venue, {'genre': 'Jazz', 'seeking': 'false'})) == {
+            'state': {'CA': 1},
+            'city': {'San Francisco, CA': 1},
+            'genre': {'Jazz': 1, 'Rock n Roll': 1},
+            'seeking': {'Not seeking talent': 1},
+        }
+
+
+def test_artist_facet_counts(app, catalogue):
+    with app.app_context():
+        assert counts(count_facets(Artist, {'state': 'CA'})) == {
+            'state': {'CA': 2},
+            'city': {'San Francisco, CA': 2},
+            'genre': {'Classical': 1, 'Jazz': 1, 'Rock n Roll': 1},
+            'seeking': {'Seeking venues': 1, 'Not seeking venues': 1},
+        }
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from app import datetime_pattern, format_datetime
+
+SHOW_TIME = datetime(2026, 5, 21, 21, 30)
+
+
+@pytest.mark.parametrize('format, text', [
+    ('full', 'Thursday May, 21, 2026 at 9:30PM'),
+    ('medium', 'Thu 05, 21, 2026 9:30PM'),
+    ('y-MM-dd HH:mm', '2026-05-21 21:30'),
+])
+def test_format_datetime_patterns(format, text):
+    assert format_datetime(SHOW_TIME, format) == text
+
+
+@pytest.mark.parametrize('format', ['short', 'long'])
+def test_format_datetime_babel_formats(format):
+    assert format_datetime(SHOW_TIME, format) == babel.dates.format_datetime(
+        SHOW_TIME, format, locale='en')
+
+
+def test_format_datetime_parses_strings():
+    assert format_datetime('2026-05-21T21:30:00', 'full') == 'Thursday May, 21, 2026 at 9:30PM'
+
+
+def test_custom_patterns_are_parsed_once():
+    datetime_pattern.cache_clear()
+    for _ in range(3):
+        format_datetime(SHOW_TIME, 'HH:mm')
+
+    assert datetime_pattern.cache_info().misses == 1
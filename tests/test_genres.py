@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from forms import VenueForm
+from models import db, Genre, Venue
+from tests.catalogue import GENRES
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations', 'versions',
+                         'f2b9d04e6a37_genres_lookup_migration.py')
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('genres_lookup_migration', MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+@pytest.fixture
+def old_schema(app):
+    # The venues and artists columns the migration changes, as they were
+    # before it, in a schema of their own; rolled back at the end
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('CREATE SCHEMA genres_migration')
+            connection.exec_driver_sql('SET LOCAL search_path TO genres_migration')
+            for table in ('venues', 'artists'):
+                connection.exec_driver_sql(
+                    "CREATE TABLE {0} (id serial PRIMARY KEY, "
+                    "genres varchar[] NOT NULL DEFAULT '{{}}')".format(table))
+                connection.exec_driver_sql(
+                    'CREATE INDEX ix_{0}_genres ON {0} USING gin (genres)'.format(table))
+            connection.exec_driver_sql(
+                "INSERT INTO venues (genres) VALUES ('{Jazz,Folk}'), ('{}'), ('{\" Zydeco \",Jazz}')")
+            connection.exec_driver_sql("INSERT INTO artists (genres) VALUES ('{Rock n Roll,Other}')")
+
+            yield connection
+            connection.rollback()
+
+
+def run(connection, step):
+    with Operations.context(MigrationContext.configure(connection)):
+        step()
+
+
+def test_genre_names_become_codes_and_back(old_schema):
+    migration = load_migration()
+    run(old_schema, migration.upgrade)
+
+    genres = dict(old_schema.exec_driver_sql('SELECT name, id FROM genres').all())
+    # The form genres in their order, then the other genres of the rows
+    assert [genres[name] for name in migration.GENRES] == list(range(1, len(migration.GENRES) + 1))
+    assert genres['Zydeco'] > len(migration.GENRES)
+
+    assert old_schema.exec_driver_sql('SELECT genre_ids FROM venues ORDER BY id').scalars().all() == [
+        sorted([genres['Jazz'], genres['Folk']]), [], sorted([genres['Jazz'], genres['Zydeco']])]
+    assert old_schema.exec_driver_sql('SELECT genre_ids FROM artists').scalar() == [
+        genres['Rock n Roll'], genres['Other']]
+
+    run(old_schema, migration.downgrade)
+    # Back to names, in the order of the codes; the padded name was trimmed
+    assert old_schema.exec_driver_sql('SELECT genres FROM venues ORDER BY id').scalars().all() == [
+        ['Folk', 'Jazz'], [], ['Jazz', 'Zydeco']]
+    assert old_schema.exec_driver_sql('SELECT genres FROM artists').scalar() == ['Rock n Roll', 'Other']
+
+
+def test_form_choices_come_from_the_genres_table(app):
+    with app.test_request_context():
+        assert VenueForm().genres.choices == [(name, name) for name in GENRES]
+
+        db.session.add(Genre(name='Zydeco'))
+        db.session.commit()
+        # Cached until cleared
+        assert ('Zydeco', 'Zydeco') not in VenueForm().genres.choices
+        Genre.clear_cache()
+        assert VenueForm().genres.choices[-1] == ('Zydeco', 'Zydeco')
+
+        db.session.delete(Genre.query.filter_by(name='Zydeco').one())
+        db.session.commit()
+        Genre.clear_cache()
+
+
+def test_unknown_genres_are_refused(app, client):
+    response = client.post('/venues/create', data={
+        'name': 'The Dueling Pianos Bar', 'city': 'New York', 'state': 'NY',
+        'address': '335 Delancey Street', 'phone': '914-003-1132', 'genres': ['Zydeco'],
+        'facebook_link': 'https://www.facebook.com/theduelingpianos'})
+
+    assert response.status_code == 200
+    with app.app_context():
+        assert Venue.query.count() == 0
+
+
+def test_genres_are_read_and_written_as_names(app):
+    with app.app_context():
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA',
+                      genres=['Jazz', 'Nope', 'Folk'])
+        assert venue.genre_ids == [GENRES.index('Jazz') + 1, GENRES.index('Folk') + 1]
+        assert venue.genres == ['Jazz', 'Folk']
@@ -0,0 +1,54 @@
+import pytest
+
+from cache import cache, LRUBackend
+from models import db, Venue
+
+LISTINGS = ['/venues', '/artists', '/shows', '/api/v1/venues', '/api/v1/shows']
+
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_matching_etags_are_not_modified(client, catalogue, path):
+    response = client.get(path)
+    assert response.status_code == 200
+
+    response = client.get(path, headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert not response.data
+
+
+@pytest.mark.parametrize('path', LISTINGS)
+def test_unchanged_since_is_not_modified(client, catalogue, path):
+    last_modified = client.get(path).headers['Last-Modified']
+
+    response = client.get(path, headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+
+def test_writes_change_the_tag(app, client, catalogue):
+    etag = client.get('/venues').headers['ETag']
+
+    with app.app_context():
+        # No change, no new tag
+        Venue.query.filter(Venue.id == 0).update({'name': 'Nowhere Hall'})
+        db.session.commit()
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        db.session.get(Venue, catalogue['venues'][0]).name = 'The Musical Hop Again'
+        db.session.commit()
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'The Musical Hop Again' in response.get_data(as_text=True)
+
+
+def test_cached_pages_are_of_the_tagged_version(app, client, catalogue, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', LRUBackend())
+    assert 'The Musical Hop' in client.get('/venues').get_data(as_text=True)
+
+    with app.app_context():
+        # A write of another worker, which does not invalidate this one's cache
+        db.session.get(Venue, catalogue['venues'][0]).name = 'The Musical Hop Again'
+        db.session.commit()
+
+    assert 'The Musical Hop Again' in client.get('/venues').get_data(as_text=True)
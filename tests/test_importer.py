@@ -0,0 +1,34 @@
+import json
+
+from models import Venue
+
+VENUE = {
+    'name': 'The Dueling Pianos Bar', 'city': 'New York', 'state': 'NY',
+    'address': '335 Delancey Street', 'phone': '914-003-1132', 'genres': ['Classical'],
+    'image_link': 'https://images.example.com/pianos.jpg',
+    'facebook_link': 'https://www.facebook.com/theduelingpianos',
+    'website_link': 'https://www.theduelingpianos.com',
+}
+
+
+def test_import_jsonl_reports_unreadable_lines(app, tmp_path):
+    path = tmp_path / 'venues.jsonl'
+    path.write_text('\n'.join([
+        json.dumps(VENUE),
+        '{"name": "Half a venue",',
+        json.dumps(['not', 'an', 'object']),
+        json.dumps(dict(VENUE, name='The Musical Hop')),
+    ]) + '\n', encoding='utf-8')
+
+    # The flask command pushes an app context for every command
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['import', 'venues', str(path)])
+
+    assert result.exit_code == 0, result.output
+    assert '4 rows: 2 inserted, 2 invalid, 0 failed' in result.output
+    assert 'line 2: line' in result.stderr and 'Invalid JSON' in result.stderr
+    assert "line 3: line - ['Not a JSON object']" in result.stderr
+
+    with app.app_context():
+        assert sorted(venue.name for venue in Venue.query) == [
+            'The Dueling Pianos Bar', 'The Musical Hop']
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import tuple_
+
+from app import app
+from models import db
+from tests.catalogue import empty_tables, seed_catalogue
+from view_models import VENUES, SHOWS, listing_query, venue_shows_select, artist_shows_select
+
+
+@pytest.fixture(scope='module')
+def large_catalogue(database):
+    # Enough rows for the planner to prefer the indexes over scanning tables
+    with app.app_context():
+        seed_catalogue(5000, 2000, 20000)
+        yield
+        empty_tables()
+
+
+def explain(statement):
+    sql = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    return '\n'.join(row[0] for row in db.session.execute(db.text('EXPLAIN {}'.format(sql))))
+
+
+@pytest.mark.parametrize('statement, index', [
+    (lambda: venue_shows_select(42), 'ix_shows_venue_id_start_time'),
+    (lambda: artist_shows_select(42), 'ix_shows_artist_id_start_time'),
+    (lambda: listing_query(VENUES, {'city': 'City 5', 'state': 'CA'}).order_by(
+        *VENUES.columns).limit(30).statement, 'ix_venues_state_city_id'),
+])
+def test_index_only_scans(large_catalogue, statement, index):
+    with app.app_context():
+        plan = explain(statement())
+
+    assert 'Index Only Scan using {} '.format(index) in plan, plan
+
+
+def listing_page(listing, values=None, direction='next'):
+    # Statement of a listing page as paginate() makes it
+    query = listing_query(listing)
+    if direction == 'next':
+        if values is not None:
+            query = query.filter(tuple_(*listing.columns) > values)
+        query = query.order_by(*listing.columns)
+    else:
+        query = query.filter(tuple_(*listing.columns) < values).order_by(
+            *[column.desc() for column in listing.columns])
+    return query.limit(31).statement
+
+
+@pytest.mark.parametrize('statement, index', [
+    (lambda: listing_page(VENUES), 'ix_venues_state_city_id'),
+    (lambda: listing_page(VENUES, ('NY', 'City 50', 2500)), 'ix_venues_state_city_id'),
+    (lambda: listing_page(VENUES, ('NY', 'City 50', 2500), 'prev'), 'ix_venues_state_city_id'),
+    (lambda: listing_page(SHOWS), 'ix_shows_start_time_id'),
+    (lambda: listing_page(SHOWS, (datetime(2026, 1, 1), 10000)), 'ix_shows_start_time_id'),
+    (lambda: listing_page(SHOWS, (datetime(2026, 1, 1), 10000), 'prev'), 'ix_shows_start_time_id'),
+])
+def test_listings_are_read_in_keyset_order(large_catalogue, statement, index):
+    # Pages are read from the index in order, without sorting the table
+    with app.app_context():
+        plan = explain(statement())
+
+    assert 'Index Only Scan using {} '.format(index) in plan or \
+        'Index Only Scan Backward using {} '.format(index) in plan, plan
+    assert 'Sort' not in plan, plan
@@ -0,0 +1,187 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import jobs
+from counters import check_upcoming_show_counters
+from matchmaking import refresh_matches
+from models import db, Artist, Job, Match, Show, Venue
+from tasks import enqueue_counters_refresh
+
+# Tasks of the tests, on a queue of their own
+CALLS = []
+
+
+@jobs.task('tests.record', queue='tests')
+def record_task(**payload):
+    CALLS.append(payload)
+
+
+@jobs.task('tests.broken', queue='tests', max_attempts=2)
+def broken_task():
+    raise RuntimeError('broken')
+
+
+def queued_jobs():
+    return [(job.task, job.payload, job.idempotency_key, job.status)
+            for job in Job.query.order_by(Job.id)]
+
+
+def test_jobs_are_enqueued_once_per_key(app):
+    with app.app_context():
+        jobs.enqueue('tests.record', {'number': 1}, key='tests:1')
+        jobs.enqueue('tests.record', {'number': 2}, key='tests:1')
+        jobs.enqueue('tests.record', {'number': 3})
+        db.session.commit()
+
+        assert queued_jobs() == [('tests.record', {'number': 1}, 'tests:1', 'queued'),
+                                 ('tests.record', {'number': 3}, None, 'queued')]
+
+
+def test_claims_skip_the_locked_jobs(app):
+    with app.app_context():
+        jobs.enqueue_many('tests.record', [({'number': number}, None, None) for number in (1, 2)])
+        # Due later than now, so not claimed yet
+        jobs.enqueue('tests.record', {'number': 3}, run_at=datetime.now() + timedelta(hours=1))
+        db.session.commit()
+        first, second, later = [job.id for job in Job.query.order_by(Job.id)]
+
+        # Another worker holds the first job
+        with db.engine.connect() as other:
+            other.execute(db.select(Job.id).where(Job.id == first).with_for_update())
+
+            job = jobs.claim('tests')
+            assert job.id == second
+            assert job.attempts == 1
+            assert jobs.claim('tests') is None
+
+        assert db.session.get(Job, second).status == jobs.RUNNING
+        assert jobs.claim('tests').id == first
+
+
+def test_jobs_run_with_their_payload(app):
+    CALLS.clear()
+    with app.app_context():
+        jobs.enqueue('tests.record', {'number': 1})
+        db.session.commit()
+
+        jobs.run_job(jobs.claim('tests'))
+        assert CALLS == [{'number': 1}]
+        assert queued_jobs()[0][3] == jobs.DONE
+
+
+def test_failed_jobs_are_retried_with_backoff(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_RETRY_DELAY', 10)
+    with app.app_context():
+        jobs.enqueue('tests.broken')
+        db.session.commit()
+
+        before = datetime.now()
+        jobs.run_job(jobs.claim('tests'))
+        job = Job.query.one()
+        assert job.status == jobs.QUEUED
+        assert 'broken' in job.last_error
+        # Half to all of the delay, jittered
+        assert before + timedelta(seconds=5) <= job.run_at <= datetime.now() + timedelta(seconds=10)
+        assert jobs.claim('tests') is None
+
+        job.run_at = datetime.now()
+        db.session.commit()
+        jobs.run_job(jobs.claim('tests'))
+        job = Job.query.one()
+        assert (job.status, job.attempts) == (jobs.FAILED, 2)
+        assert job.finished_at is not None
+
+
+def test_retry_delays_grow_up_to_the_maximum(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_RETRY_DELAY', 10)
+    monkeypatch.setitem(app.config, 'JOB_RETRY_MAX_DELAY', 60)
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: high)
+
+    with app.app_context():
+        assert [jobs.retry_delay(attempts).total_seconds() for attempts in range(1, 6)] == [
+            10, 20, 40, 60, 60]
+
+
+def test_stale_jobs_are_requeued(app):
+    with app.app_context():
+        jobs.enqueue_many('tests.broken', [(None, None, None), (None, None, None)])
+        jobs.enqueue('tests.record')
+        db.session.commit()
+        stale, last_attempt, running = [job.id for job in Job.query.order_by(Job.id)]
+
+        for job_id in (stale, last_attempt, running):
+            jobs.claim('tests')
+        db.session.execute(db.update(Job).where(Job.id == last_attempt).values(attempts=2))
+        db.session.execute(db.update(Job).where(Job.id != running).values(
+            locked_at=datetime.now() - timedelta(hours=1)))
+        db.session.commit()
+
+        assert jobs.requeue_stale(600) == 2
+        assert [job.status for job in Job.query.order_by(Job.id)] == [
+            jobs.QUEUED, jobs.FAILED, jobs.RUNNING]
+
+
+def test_counter_refreshes_share_a_window(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'COUNTERS_REFRESH_WINDOW', 3600)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    with app.app_context():
+        enqueue_counters_refresh(start, start + timedelta(minutes=20), start + timedelta(minutes=59),
+                                 start + timedelta(hours=1), start - timedelta(days=2))
+        db.session.commit()
+
+        assert [(job.payload, job.run_at) for job in Job.query.order_by(Job.run_at)] == [
+            ({'since': start.isoformat(), 'until': (start + timedelta(hours=1)).isoformat()},
+             start + timedelta(hours=1)),
+            ({'since': (start + timedelta(hours=1)).isoformat(),
+              'until': (start + timedelta(hours=2)).isoformat()},
+             start + timedelta(hours=2)),
+        ]
+
+
+def test_counter_refreshes_recount_the_window_only(app, catalogue):
+    with app.app_context():
+        # A show of the first venue and artist has just started, and the
+        # second venue's counter is off for another reason
+        show = Show.query.filter(Show.venue_id == catalogue['venues'][0],
+                                 Show.start_time > datetime.now()).one()
+        show.start_time = datetime.now() - timedelta(minutes=1)
+        db.session.get(Venue, catalogue['venues'][1]).num_upcoming_shows = 5
+        db.session.commit()
+
+        jobs.TASKS['counters.refresh'].function(
+            since=(datetime.now() - timedelta(minutes=5)).isoformat(),
+            until=datetime.now().isoformat())
+
+        assert db.session.get(Venue, catalogue['venues'][0]).num_upcoming_shows == 0
+        assert db.session.get(Artist, catalogue['artists'][0]).num_upcoming_shows == 0
+        assert check_upcoming_show_counters() == [('venues', catalogue['venues'][1], 5, 1)]
+
+
+def test_matches_refreshes_do_not_overlap(app, catalogue):
+    finished = threading.Event()
+
+    def refresh():
+        with app.app_context():
+            refresh_matches()
+            finished.set()
+
+    with app.app_context():
+        # The Wild Sax Band plays Jazz, like The Musical Hop
+        db.session.get(Artist, catalogue['artists'][1]).seeking_venue = True
+        db.session.commit()
+
+        # A refresh in progress holds the lock until it commits
+        with db.engine.connect() as running:
+            running.execute(db.select(db.func.pg_advisory_xact_lock(
+                db.func.hashtext('matches.refresh'))))
+            thread = threading.Thread(target=refresh)
+            thread.start()
+            time.sleep(0.5)
+            assert not finished.is_set()
+            running.commit()
+
+        thread.join(10)
+        assert finished.is_set()
+        assert Match.query.count() == 1
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from models import db
+
+
+@pytest.mark.parametrize('path, text', [
+    ('/venues', b'The Musical Hop'),
+    ('/artists', b'Guns N Petals'),
+    ('/shows', b'The Wild Sax Band'),
+])
+def test_listing_pages(client, catalogue, path, text):
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert text in response.data
+
+
+@pytest.mark.parametrize('path, count', [
+    ('/api/v1/venues', 2),
+    ('/api/v1/artists', 2),
+    ('/api/v1/shows', 4),
+])
+def test_api_collections(client, catalogue, path, count):
+    response = client.get(path)
+    data = json.loads(response.data)
+
+    assert response.status_code == 200
+    assert len(data['data']) == count
+    assert data['next_cursor'] is None
+    assert data['prev_cursor'] is None
+
+
+def test_api_collection_pages(client, catalogue):
+    first = json.loads(client.get('/api/v1/shows?limit=3').data)
+    second = json.loads(client.get('/api/v1/shows?limit=3&cursor=' + first['next_cursor']).data)
+    back = json.loads(client.get('/api/v1/shows?limit=3&cursor=' + second['prev_cursor']).data)
+
+    assert len(first['data']) == 3
+    assert len(second['data']) == 1
+    assert second['next_cursor'] is None
+    assert back['data'] == first['data']
+
+
+def test_api_stream_releases_its_connection(client, catalogue, app):
+    with client.get('/api/v1/venues?format=ndjson') as response:
+        assert len(response.data.splitlines()) == 2
+
+    with app.app_context():
+        open_transactions = db.session.execute(db.text("""
+            SELECT count(*) FROM pg_stat_activity
+            WHERE datname = current_database() AND pid <> pg_backend_pid()
+              AND state LIKE 'idle in transaction%'
+        """)).scalar()
+
+    assert open_transactions == 0
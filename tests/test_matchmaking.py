@@ -0,0 +1,84 @@
+import pytest
+
+from matchmaking import refresh_matches, venue_matches, artist_matches
+from models import db, Artist, Match, Venue
+
+
+@pytest.fixture
+def matchmaking(app):
+    # A venue seeking Jazz and Folk in San Francisco, and artists scoring
+    # from 4 down to 1 for it, then artists it never matches
+    with app.app_context():
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA',
+                      genres=['Jazz', 'Folk'], seeking_talent=True)
+        closed = Venue(name='Park Square', city='San Francisco', state='CA',
+                       genres=['Jazz'], seeking_talent=False)
+        artists = [
+            Artist(name='Same city, two genres', city='San Francisco', state='CA',
+                   genres=['Jazz', 'Folk'], seeking_venue=True),
+            Artist(name='Same city, one genre', city='san francisco', state='CA',
+                   genres=['Jazz'], seeking_venue=True),
+            Artist(name='Same state', city='Los Angeles', state='CA',
+                   genres=['Folk'], seeking_venue=True),
+            Artist(name='Other state', city='New York', state='NY',
+                   genres=['Jazz', 'Blues'], seeking_venue=True),
+            Artist(name='Other genre', city='San Francisco', state='CA',
+                   genres=['Rock n Roll'], seeking_venue=True),
+            Artist(name='Not seeking', city='San Francisco', state='CA',
+                   genres=['Jazz'], seeking_venue=False),
+        ]
+        db.session.add_all([venue, closed] + artists)
+        db.session.commit()
+
+        return {'venue': venue.id, 'closed': closed.id,
+                'artists': [artist.id for artist in artists]}
+
+
+def test_matches_score_genres_and_area(app, matchmaking):
+    with app.app_context():
+        assert refresh_matches() == 4
+
+        scores = [(artist_id, score) for artist_id, name, image_link, score
+                  in venue_matches(matchmaking['venue'])]
+        assert scores == list(zip(matchmaking['artists'][:4], [4, 3, 2, 1]))
+        assert venue_matches(matchmaking['closed']) == []
+        assert artist_matches(matchmaking['artists'][4]) == []
+        assert artist_matches(matchmaking['artists'][5]) == []
+
+
+def test_matches_keep_the_top_of_either_side(app, matchmaking):
+    with app.app_context():
+        # Each artist has a single venue, so all pairs stay in its top
+        assert refresh_matches(limit=2) == 4
+        assert [match.score for match in venue_matches(matchmaking['venue'], limit=2)] == [4, 3]
+
+        Artist.query.update({Artist.seeking_venue: False}, synchronize_session=False)
+        db.session.commit()
+        assert refresh_matches() == 0
+        assert Match.query.count() == 0
+
+
+def test_recommendations_api(app, client, matchmaking):
+    with app.app_context():
+        refresh_matches()
+
+    response = client.get('/api/v1/venues/{}/recommendations'.format(matchmaking['venue']))
+    assert response.status_code == 200
+    assert [match['name'] for match in response.get_json()['data']] == [
+        'Same city, two genres', 'Same city, one genre', 'Same state', 'Other state']
+
+    response = client.get('/api/v1/artists/{}/recommendations?fields=id,score'.format(
+        matchmaking['artists'][2]))
+    assert response.get_json() == {'data': [{'id': matchmaking['venue'], 'score': 2}]}
+
+    assert client.get('/api/v1/venues/0/recommendations').status_code == 404
+
+
+def test_detail_pages_show_the_recommendations(app, client, matchmaking):
+    with app.app_context():
+        refresh_matches()
+
+    assert 'Same city, two genres' in client.get(
+        '/venues/{}'.format(matchmaking['venue'])).get_data(as_text=True)
+    assert 'The Musical Hop' in client.get(
+        '/artists/{}'.format(matchmaking['artists'][0])).get_data(as_text=True)
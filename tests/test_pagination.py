@@ -0,0 +1,84 @@
+import base64
+import json
+
+import pytest
+
+from models import db, Artist, Show, Venue
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/venues', ['prev', []]),
+    ('/venues', ['next', ['CA', 'San Francisco']]),
+    ('/venues', ['next', ['CA', 'San Francisco', '1']]),
+    ('/venues', ['next', ['CA', 'San Francisco', None]]),
+    ('/venues', ['next', [None, None, 1]]),
+    ('/artists', ['next', [True]]),
+    ('/artists', ['next', [[1]]]),
+    ('/shows', ['next', ['2026-01-01 20:00', 1]]),
+    ('/shows', ['prev', [{'dt': 'tomorrow'}, 1]]),
+    ('/shows', ['sideways', [{'dt': '2026-01-01T20:00:00'}, 1]]),
+    ('/api/v1/shows', ['next', [{'dt': '2026-01-01T20:00:00'}]]),
+    ('/api/v1/shows?format=ndjson', ['next', [1, 1]]),
+])
+def test_invalid_cursors(client, path, payload):
+    separator = '&' if '?' in path else '?'
+    response = client.get(path + separator + 'cursor=' + cursor(payload))
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/venues', ['next', ['', '', 1]]),
+    ('/artists', ['prev', [2]]),
+    ('/shows', ['next', [{'dt': '2026-01-01T20:00:00'}, 1]]),
+    ('/api/v1/venues?format=ndjson', ['next', ['CA', 'San Francisco', 1]]),
+])
+def test_valid_cursors(client, catalogue, path, payload):
+    separator = '&' if '?' in path else '?'
+
+    # Closing a stream ends its transaction
+    with client.get(path + separator + 'cursor=' + cursor(payload)) as response:
+        assert response.status_code == 200
+        assert response.data
+
+
+def walk(client, path, cursor=None):
+    # Items of all pages of one row, following the cursors of the given
+    # direction from the first page or the cursor
+    items = []
+    direction = 'prev_cursor' if cursor else 'next_cursor'
+    while True:
+        response = client.get(path, query_string={'limit': 1, 'cursor': cursor})
+        assert response.status_code == 200
+        page = response.get_json()
+        items.extend(page['data'])
+        cursor = page[direction]
+        if cursor is None:
+            return items, page
+
+
+@pytest.mark.parametrize('path, key', [
+    ('/api/v1/venues', lambda item: item['id']),
+    ('/api/v1/artists', lambda item: item['id']),
+    ('/api/v1/shows', lambda item: (item['venue_id'], item['artist_id'], item['start_time'])),
+])
+def test_paging_visits_every_row(app, client, catalogue, path, key):
+    with app.app_context():
+        # Venues of an empty area, and of other areas around the catalogue's
+        db.session.add_all([Venue(name='Nowhere Hall', city='', state=''),
+                            Venue(name='The Dueling Pianos Bar', city='New York', state='NY'),
+                            Venue(name='Oakland Arena', city='Oakland', state='CA')])
+        db.session.commit()
+        counts = {'venues': Venue.query.count(), 'artists': Artist.query.count(),
+                  'shows': Show.query.count()}
+
+    forward, last_page = walk(client, path)
+    assert len(set(map(key, forward))) == len(forward) == counts[path.rsplit('/', 1)[1]]
+
+    backward, first_page = walk(client, path, last_page['prev_cursor'])
+    assert [key(item) for item in reversed(backward)] == [key(item) for item in forward[:-1]]
+    assert first_page['data'] == forward[:1]
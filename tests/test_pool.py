@@ -0,0 +1,54 @@
+from models import db
+from pool import statement_timeout
+
+
+def current_timeout():
+    return db.session.execute(db.text('SHOW statement_timeout')).scalar()
+
+
+def test_statement_timeout_of_web_requests_only(app, monkeypatch):
+    monkeypatch.setattr(statement_timeout, 'timeout', 1234)
+
+    with app.test_request_context():
+        assert current_timeout() == '1234ms'
+        db.session.remove()
+
+    # CLI commands and job workers run in an app context only
+    with app.app_context():
+        assert current_timeout() == '0'
+        db.session.remove()
+
+    with app.test_request_context():
+        assert current_timeout() == '1234ms'
+        db.session.remove()
+
+
+def test_pool_stats_are_kept_per_engine(app, client):
+    with app.app_context():
+        primary, replica = db.engines[None].pool, db.engines['replica_0'].pool
+        assert primary.stats is not replica.stats
+        checkouts = primary.stats.checkouts, replica.stats.checkouts
+
+        with db.engines[None].connect():
+            assert primary.stats.in_use >= 1
+        assert primary.stats.checkouts == checkouts[0] + 1
+        assert replica.stats.checkouts == checkouts[1]
+
+    stats = client.get('/admin/pool').get_json()
+    assert set(stats) == {'primary', 'replica_0'}
+    assert stats['primary']['size'] == app.config['DB_POOL_SIZE']
+
+
+def test_recreated_pools_keep_their_stats(app):
+    with app.app_context():
+        engine = db.engines['replica_0']
+        stats = engine.pool.stats
+        checkouts = stats.checkouts
+        engine.dispose()
+
+        with engine.connect():
+            pass
+        # Counted once, by the listeners the new pool got from the old one
+        assert engine.pool.stats is stats
+        assert stats.checkouts == checkouts + 1
+        assert stats.in_use == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from queries import record_queries
+
+# Most queries each route may run with the listing cache off: the version
+# of the page, its rows and the facet counts of listings, and the entity,
+# shows and recommendations of detail pages
+QUERY_BUDGETS = [
+    ('GET', '/venues', 3),
+    ('GET', '/artists', 3),
+    ('GET', '/artists?genre=Jazz&seeking=true', 3),
+    ('GET', '/shows', 2),
+    ('POST', '/venues/search', 1),
+    ('POST', '/artists/search', 1),
+    ('GET', '/venues/1', 4),
+    ('GET', '/artists/1', 4),
+    ('GET', '/api/v1/venues/1', 3),
+    ('GET', '/api/v1/artists/1', 3),
+]
+
+
+@pytest.mark.parametrize('method, path, budget', QUERY_BUDGETS)
+def test_query_budget(client, catalogue, method, path, budget):
+    data = {'search_term': 'the'} if method == 'POST' else None
+    # The genre names are cached per process
+    client.open(path, method=method, data=data)
+
+    with record_queries() as queries:
+        response = client.open(path, method=method, data=data)
+
+    assert response.status_code == 200
+    assert queries.count <= budget, queries.slowest_statement
+
+
+def test_server_timing_reports_the_queries(client, catalogue):
+    response = client.get('/venues/1')
+
+    assert 'db;dur=' in response.headers['Server-Timing']
+    assert 'desc="4 queries"' in response.headers['Server-Timing']
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from sqlalchemy.orm import Session
+
+from cache import cache, LRUBackend
+from models import db, Venue
+from pool import InstrumentedQueuePool
+from replicas import replica_router
+from tests.catalogue import empty_tables
+
+NEW_VENUE = {
+    'name': 'The Dueling Pianos Bar', 'city': 'New York', 'state': 'NY',
+    'address': '335 Delancey Street', 'phone': '914-003-1132', 'genres': ['Jazz'],
+    'image_link': 'https://images.example.com/pianos.jpg',
+    'facebook_link': 'https://www.facebook.com/theduelingpianos',
+    'website_link': 'https://www.theduelingpianos.com',
+}
+
+
+@pytest.fixture
+def replica(app):
+    # The replica stand-in never replicates the primary, so it lags every
+    # write; it holds one venue of its own
+    with app.app_context():
+        with Session(db.engines['replica_0']) as replica_session:
+            replica_session.add(Venue(name='The Replica Hall', city='Oakland', state='CA',
+                                      genres=['Folk']))
+            replica_session.commit()
+        replica_router.refresh()
+
+    yield 'replica_0'
+
+    replica_router.status = {}
+    replica_router.checked_at = 0.0
+    with app.app_context():
+        empty_tables(db.engines['replica_0'])
+
+
+def test_replica_engines_have_the_engine_options(app):
+    bind = app.config['SQLALCHEMY_BINDS']['replica_0']
+    assert bind['connect_args']['connect_timeout'] == app.config['REPLICA_CONNECT_TIMEOUT']
+
+    with app.app_context():
+        pool = db.engines['replica_0'].pool
+        assert isinstance(pool, InstrumentedQueuePool)
+        assert pool.size() == app.config['DB_POOL_SIZE']
+
+
+def test_reads_go_to_a_healthy_replica(client, catalogue, replica):
+    assert replica_router.status[replica] == {'healthy': True, 'lag': 0.0}
+
+    page = client.get('/venues').get_data(as_text=True)
+    assert 'The Replica Hall' in page
+    assert 'The Musical Hop' not in page
+
+
+def test_reads_fall_back_to_the_primary(app, client, catalogue, replica, monkeypatch):
+    monkeypatch.setitem(app.config, 'REPLICA_MAX_LAG_SECONDS', -1)
+    with app.app_context():
+        replica_router.refresh()
+
+    assert not replica_router.status[replica]['healthy']
+    assert 'The Musical Hop' in client.get('/venues').get_data(as_text=True)
+
+
+def test_stale_checks_are_not_trusted(client, catalogue, replica, monkeypatch):
+    monkeypatch.setattr(replica_router, 'checked_at', time.monotonic() - 3600)
+
+    assert 'The Musical Hop' in client.get('/venues').get_data(as_text=True)
+
+
+def test_reads_after_a_write_go_to_the_primary(client, catalogue, replica):
+    response = client.post('/venues/create', data=NEW_VENUE)
+    assert response.status_code < 400
+
+    page = client.get('/venues').get_data(as_text=True)
+    assert 'The Dueling Pianos Bar' in page
+    assert 'The Replica Hall' not in page
+
+
+def test_replica_reads_after_a_write_are_not_cached(app, client, catalogue, replica, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', LRUBackend())
+
+    client.post('/venues/create', data=NEW_VENUE)
+
+    # Another client reads the lagging replica first
+    assert 'The Replica Hall' in app.test_client().get('/venues').get_data(as_text=True)
+
+    page = client.get('/venues').get_data(as_text=True)
+    assert 'The Dueling Pianos Bar' in page
+    assert 'The Replica Hall' not in page
+
+
+def test_replica_reads_are_cached_once_the_window_has_passed(app, client, catalogue, replica, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', LRUBackend())
+    monkeypatch.setattr(cache, 'replica_window', 0)
+
+    client.post('/venues/create', data=NEW_VENUE)
+    assert 'The Replica Hall' in app.test_client().get('/venues').get_data(as_text=True)
+    hits = cache.stats()['venues'].get('hits', 0)
+
+    assert 'The Replica Hall' in app.test_client().get('/venues').get_data(as_text=True)
+    assert cache.stats()['venues']['hits'] > hits
+
+
+def test_replicas_are_checked_in_the_background(app, replica, monkeypatch):
+    monkeypatch.delattr(replica_router, 'start')
+    replica_router.status = {}
+    replica_router.checked_at = 0.0
+
+    try:
+        with app.test_request_context():
+            # No request waits on the first check
+            assert replica_router.choose() is None
+
+            deadline = time.monotonic() + 10
+            while not replica_router.status and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert replica_router.choose() == replica
+    finally:
+        replica_router.stop()
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+from importer import read_show_lines
+from models import db, Show, Venue
+
+
+def shows(app):
+    with app.app_context():
+        return [(show.artist_id, show.venue_id, show.start_time, show.duration)
+                for show in Show.query.filter(Show.start_time >= datetime(2030, 1, 1))]
+
+
+def test_show_lines_keep_empty_columns():
+    assert list(read_show_lines('artist_id,venue_id,start_time\n1,2\n1,2,,90\n1,2,2030-01-01 20:00,\n')) == [
+        (2, {'artist_id': '1', 'venue_id': '2'}),
+        (3, {'artist_id': '1', 'venue_id': '2', 'start_time': '', 'duration': '90'}),
+        (4, {'artist_id': '1', 'venue_id': '2', 'start_time': '2030-01-01 20:00'}),
+    ]
+
+
+def test_batch_books_all_shows(app, client, catalogue):
+    response = client.post('/shows/create/batch', data={
+        'shows': '1,1,2030-01-01 20:00\n2,2,2030-01-01 20:00,90\n'})
+
+    assert response.status_code == 200
+    assert '2 shows were successfully listed' in response.get_data(as_text=True)
+    assert sorted(shows(app)) == [
+        (1, 1, datetime(2030, 1, 1, 20), 120),
+        (2, 2, datetime(2030, 1, 1, 20), 90),
+    ]
+
+
+@pytest.mark.parametrize('lines, field', [
+    ('1,1', 'start_time'),
+    ('1,1,,90', 'start_time'),
+    ('99999999999,1,2030-01-01 20:00', 'artist_id'),
+    ('1,99999999999,2030-01-01 20:00', 'venue_id'),
+    ('1,3,2030-01-01 20:00', 'venue_id'),
+])
+def test_batch_reports_invalid_lines(app, client, catalogue, lines, field):
+    response = client.post('/shows/create/batch', data={
+        'shows': '2,2,2030-01-01 20:00\n' + lines})
+
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert '<td>2</td>\n                <td>{}</td>'.format(field) in page
+    assert 'None of the 2 shows could be listed' in page
+    assert shows(app) == []
+
+
+@pytest.mark.parametrize('data', [
+    {'artist_id': '1', 'venue_id': '1'},
+    {'artist_id': '99999999999', 'venue_id': '1', 'start_time': '2030-01-01 20:00'},
+])
+def test_create_show_refuses_invalid_forms(app, client, catalogue, data):
+    response = client.post('/shows/create', data=data)
+
+    assert response.status_code == 200
+    assert shows(app) == []
+
+
+def test_create_show(app, client, catalogue):
+    client.post('/shows/create', data={'artist_id': '1', 'venue_id': '1',
+                                       'start_time': '2030-01-01 20:00'})
+
+    assert shows(app) == [(1, 1, datetime(2030, 1, 1, 20), 120)]
+    with app.app_context():
+        assert db.session.get(Venue, 1).num_upcoming_shows == 2
+
+
+def test_create_show_booked_meanwhile(app, client, catalogue, monkeypatch):
+    with app.app_context():
+        booked = Show.query.filter(Show.venue_id == catalogue['venues'][0],
+                                   Show.start_time > datetime.now()).one()
+        start_time = booked.start_time
+    # Booked by another request after the conflicts were checked
+    monkeypatch.setattr(app_module, 'find_conflicts', lambda *args: [])
+
+    response = client.post('/shows/create', data={
+        'artist_id': str(catalogue['artists'][1]), 'venue_id': str(catalogue['venues'][0]),
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+
+    assert response.status_code == 200
+    assert 'was booked at that time meanwhile' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Show.query.filter(Show.start_time == start_time).count() == 1
+        assert db.session.get(Venue, catalogue['venues'][0]).num_upcoming_shows == 1
+
+
+def test_failed_writes_answer_an_error(app, client, catalogue, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('Database unavailable')
+
+    monkeypatch.setattr(app_module, 'enqueue_counters_refresh', fail)
+
+    response = client.post('/shows/create', data={'artist_id': '1', 'venue_id': '1',
+                                                  'start_time': '2030-01-01 20:00'})
+
+    assert response.status_code == 500
+    assert shows(app) == []
@@ -0,0 +1,146 @@
+import io
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Flask
+
+import thumbnails as thumbnails_module
+from app import app as fyyur_app
+from thumbnails import ThumbnailCache, UnsafeURLError
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def picture(width=800, height=600):
+    data = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(data, format='PNG')
+    return data.getvalue()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    # Stand-in image host: /<name>.png answers a picture, anything else 404
+
+    def do_GET(self):
+        if not self.path.endswith('.png'):
+            self.send_error(404)
+            return
+        body = picture()
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def image_host():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+
+
+@pytest.fixture
+def thumbnail_app(tmp_path):
+    # A proxy of its own, storing in a temporary directory
+    app = Flask(__name__)
+    app.config.update({key: value for key, value in fyyur_app.config.items()
+                       if key.startswith('THUMBNAIL_')})
+    app.config.update(SECRET_KEY='test', THUMBNAIL_CACHE_DIR=str(tmp_path),
+                      THUMBNAIL_ALLOW_PRIVATE=True)
+    return app
+
+
+@pytest.fixture
+def cache(thumbnail_app):
+    return ThumbnailCache(thumbnail_app)
+
+
+def cache_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, filename))
+               for root, directories, filenames in os.walk(directory) for filename in filenames)
+
+
+def test_cold_thumbnails_redirect_then_are_served(thumbnail_app, cache, image_host):
+    url = image_host + '/band.png'
+    with thumbnail_app.test_request_context():
+        proxied = cache.url(url)
+    client = thumbnail_app.test_client()
+
+    response = client.get(proxied)
+    assert response.status_code == 302
+    assert response.headers['Location'] == url
+
+    cache._executor.shutdown(wait=True)
+    response = client.get(proxied)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert Image.open(io.BytesIO(response.get_data())).size == (300, 225)
+
+
+def test_unsigned_urls_are_not_proxied(thumbnail_app, cache, image_host):
+    client = thumbnail_app.test_client()
+    assert client.get('/thumbnails/tile', query_string={'url': image_host + '/band.png'}).status_code == 404
+
+
+def test_stores_walk_the_cache_only_when_full(cache, image_host, monkeypatch):
+    walks = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: walks.append(1) or evict())
+    cache.store('tile', image_host + '/0.png')
+    size = cache_bytes(cache.directory)
+    cache.max_bytes = size * 5
+
+    for number in range(1, 5):
+        cache.store('tile', image_host + '/{}.png'.format(number))
+    # Only the first store counts the directory
+    assert len(walks) == 1
+
+    cache.store('tile', image_host + '/5.png')
+    assert len(walks) == 2
+    assert cache_bytes(cache.directory) <= cache.max_bytes * thumbnails_module.EVICTION_TARGET
+    assert cache._bytes == cache_bytes(cache.directory)
+    assert not os.path.exists(cache.path('tile', image_host + '/0.png'))
+
+
+def test_failures_are_retried_later_and_pruned(cache, image_host):
+    cache.retry_seconds = 0
+    cache.fetch('tile', image_host + '/missing')
+    cache.fetch('tile', image_host + '/gone')
+
+    assert list(cache._failed) == [('tile', image_host + '/gone')]
+
+
+def test_private_addresses_are_refused(cache, image_host):
+    cache.allow_private = False
+
+    with pytest.raises(UnsafeURLError):
+        cache.download(image_host + '/band.png')
+    with pytest.raises(UnsafeURLError):
+        cache.download('file:///etc/passwd')
+
+
+def test_connections_go_to_the_checked_address(cache, monkeypatch):
+    # The host answers a public address, then an internal one
+    answers = [[(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 80))],
+               [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 80))]]
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda *args, **kwargs: answers.pop(0))
+    connected = []
+
+    def create_connection(address, *args):
+        connected.append(address)
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(socket, 'create_connection', create_connection)
+    cache.allow_private = False
+
+    with pytest.raises(OSError):
+        cache.download('http://images.example.com/band.png')
+    assert connected == [('93.184.216.34', 80)]
+    assert len(answers) == 1
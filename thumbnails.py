@@ -0,0 +1,257 @@
+import hashlib
+import hmac
+import http.client
+import io
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from flask import abort, redirect, request, send_file, url_for
+
+# Thumbnails are served for a day; the signed URL of an image never changes
+THUMBNAIL_MAX_AGE = 24 * 60 * 60
+
+# Share of the size limit kept by an eviction; the cache directory is only
+# walked again once the thumbnails stored since then fill the rest
+EVICTION_TARGET = 0.9
+
+
+class UnsafeURLError(Exception):
+    pass
+
+
+def check_public_url(url):
+    # Refuse URLs that are not http(s); their host is checked on connecting,
+    # see public_address
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise UnsafeURLError('Not an http(s) URL: {}'.format(url))
+
+
+def public_address(host, port):
+    # Address to connect to for a host, refused if any of its addresses is
+    # private, loopback or link local, so image links can not reach internal
+    # services. The host is resolved once: resolving it again to connect
+    # could answer an internal address (DNS rebinding).
+    addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+    for address in addresses:
+        if not ipaddress.ip_address(address).is_global:
+            raise UnsafeURLError('Not a public address: {}'.format(host))
+    return addresses[0]
+
+
+def connect_public(address, timeout, source_address=None):
+    host, port = address
+    return socket.create_connection((public_address(host, port), port), timeout, source_address)
+
+
+class PublicHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, *args, **kwargs):
+        super(PublicHTTPConnection, self).__init__(*args, **kwargs)
+        self._create_connection = connect_public
+
+
+class PublicHTTPSConnection(http.client.HTTPSConnection):
+    # The certificate is still checked against the host name
+
+    def __init__(self, *args, **kwargs):
+        super(PublicHTTPSConnection, self).__init__(*args, **kwargs)
+        self._create_connection = connect_public
+
+
+class PublicHTTPHandler(urllib.request.HTTPHandler):
+
+    def http_open(self, req):
+        return self.do_open(PublicHTTPConnection, req)
+
+
+class PublicHTTPSHandler(urllib.request.HTTPSHandler):
+
+    def https_open(self, req):
+        return self.do_open(PublicHTTPSConnection, req, context=self._context)
+
+
+class PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super(PublicRedirectHandler, self).redirect_request(req, fp, code, msg, headers, newurl)
+
+
+class ThumbnailCache(object):
+    # Proxy of the remote image_link pictures. Each picture is fetched once
+    # in the background and stored resized on disk, under the hash of its
+    # URL and size; the least recently served thumbnails are evicted past
+    # THUMBNAIL_CACHE_MAX_BYTES. Until a thumbnail exists the proxy redirects
+    # to the original, so pages never wait on a remote host. Needs Pillow.
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.sizes = {}
+        self.secret = b''
+        self._pending = set()
+        self._failed = {}
+        # Bytes of the cache directory, counted on the first store and kept
+        # up to date by each store and eviction of this process
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config['THUMBNAIL_CACHE_DIR']
+        self.max_bytes = app.config['THUMBNAIL_CACHE_MAX_BYTES']
+        self.sizes = app.config['THUMBNAIL_SIZES']
+        self.timeout = app.config['THUMBNAIL_FETCH_TIMEOUT']
+        self.max_source_bytes = app.config['THUMBNAIL_MAX_SOURCE_BYTES']
+        self.retry_seconds = app.config['THUMBNAIL_RETRY_SECONDS']
+        self.allow_private = app.config['THUMBNAIL_ALLOW_PRIVATE']
+        self.secret = app.config['SECRET_KEY']
+        if isinstance(self.secret, str):
+            self.secret = self.secret.encode('utf-8')
+        self.logger = app.logger
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config['THUMBNAIL_FETCH_WORKERS'], thread_name_prefix='thumbnails')
+
+        app.add_url_rule('/thumbnails/<size>', 'thumbnail', self.serve)
+        app.jinja_env.filters['thumbnail'] = self.url
+
+    def signature(self, size, url):
+        # Only URLs rendered by the templates are proxied
+        message = '{}:{}'.format(size, url).encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def url(self, image_link, size='tile'):
+        # Template filter: {{ artist.image_link|thumbnail('detail') }}
+        if not image_link:
+            return image_link
+        return url_for('thumbnail', size=size, url=image_link,
+                       sig=self.signature(size, image_link))
+
+    def path(self, size, url):
+        key = hashlib.sha256('{}:{}'.format(size, url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key + '.jpg')
+
+    def serve(self, size):
+        url = request.args.get('url', '')
+        if size not in self.sizes or not hmac.compare_digest(
+                request.args.get('sig', ''), self.signature(size, url)):
+            abort(404)
+
+        path = self.path(size, url)
+        if os.path.exists(path):
+            # Mark as recently used for the eviction
+            os.utime(path)
+            return send_file(path, mimetype='image/jpeg', max_age=THUMBNAIL_MAX_AGE)
+
+        # Cold: fetch in the background and let the browser load the original
+        self.schedule(size, url)
+        return redirect(url)
+
+    def schedule(self, size, url):
+        key = (size, url)
+        with self._lock:
+            if key in self._pending or self._failed.get(key, 0) > time.time():
+                return
+            self._failed.pop(key, None)
+            self._pending.add(key)
+        self._executor.submit(self.fetch, size, url)
+
+    def download(self, url):
+        if self.allow_private:
+            opener = urllib.request.build_opener()
+        else:
+            # No proxy either, it would connect to the host in our place
+            check_public_url(url)
+            opener = urllib.request.build_opener(
+                urllib.request.ProxyHandler({}), PublicHTTPHandler, PublicHTTPSHandler,
+                PublicRedirectHandler)
+
+        with opener.open(url, timeout=self.timeout) as response:
+            data = response.read(self.max_source_bytes + 1)
+
+        if len(data) > self.max_source_bytes:
+            raise ValueError('Image larger than {} bytes'.format(self.max_source_bytes))
+        return data
+
+    def store(self, size, url):
+        # Fetch, resize and store a thumbnail; raises when it can not be made
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(self.download(url)))
+        image.thumbnail(self.sizes[size], Image.LANCZOS)
+
+        path = self.path(size, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so a thumbnail is never served half written
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            image.convert('RGB').save(f, format='JPEG', quality=85, optimize=True)
+        added = os.path.getsize(temporary)
+        try:
+            added -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        os.replace(temporary, path)
+
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += added
+            full = self._bytes is None or self._bytes > self.max_bytes
+        if full:
+            self.evict()
+
+    def fetch(self, size, url):
+        try:
+            self.store(size, url)
+        except Exception as e:
+            # Not retried for a while; the original keeps being linked meanwhile
+            self.logger.warning('Thumbnail of %s failed: %s', url, e)
+            with self._lock:
+                now = time.time()
+                self._failed = {key: until for key, until in self._failed.items() if until > now}
+                self._failed[(size, url)] = now + self.retry_seconds
+        finally:
+            with self._lock:
+                self._pending.discard((size, url))
+
+    def evict(self):
+        # Remove the least recently served thumbnails past the size limit.
+        # Other processes storing in the same directory are only accounted
+        # for here, so it may grow past the limit by their share until then.
+        files = []
+        for root, directories, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for mtime, size, path in files)
+        if total > self.max_bytes:
+            for mtime, size, path in sorted(files):
+                if total <= self.max_bytes * EVICTION_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+        with self._lock:
+            self._bytes = total
+
+
+thumbnails = ThumbnailCache()
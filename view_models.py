@@ -0,0 +1,166 @@
+from collections import namedtuple
+from datetime import datetime
+
+from facets import filter_query
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Listings.
+#----------------------------------------------------------------------------#
+
+# A listing is a query factory, the unique keyset columns it is paginated on,
+# the cursor key of a row, the view model of a row and the model its rows can
+# be filtered by facets on, if any. The HTML views and the JSON API share them
+# so both return the same data.
+Listing = namedtuple('Listing', 'query columns key item model')
+
+
+def listing_query(listing, filters=None):
+    # Query of a listing, keeping only the rows matching the selected facets
+    query = listing.query()
+
+    if filters and listing.model is not None:
+        query = filter_query(query, listing.model, filters)
+
+    return query
+
+
+def venues_query():
+    return db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.num_upcoming_shows
+    )
+
+
+def venue_item(venue):
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'city': venue.city,
+        'state': venue.state,
+        'num_upcoming_shows': venue.num_upcoming_shows
+    }
+
+
+def artists_query():
+    return db.session.query(
+        Artist.id,
+        Artist.name,
+        Artist.num_upcoming_shows
+    )
+
+
+def artist_item(artist):
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'num_upcoming_shows': artist.num_upcoming_shows
+    }
+
+
+def shows_query():
+    return db.session.query(
+        Show.id,
+        Show.venue_id,
+        Show.artist_id,
+        Show.start_time,
+        Venue.name.label('venue_name'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).filter(Venue.id == Show.venue_id, Artist.id == Show.artist_id)
+
+
+def show_item(show):
+    return {
+        'venue_name': show.venue_name,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'venue_id': show.venue_id,
+        'artist_id': show.artist_id,
+        'start_time': show.start_time
+    }
+
+
+VENUES = Listing(
+    venues_query,
+    [Venue.state, Venue.city, Venue.id],
+    lambda venue: (venue.state, venue.city, venue.id),
+    venue_item,
+    Venue
+)
+
+ARTISTS = Listing(
+    artists_query,
+    [Artist.id],
+    lambda artist: (artist.id,),
+    artist_item,
+    Artist
+)
+
+SHOWS = Listing(
+    shows_query,
+    [Show.start_time, Show.id],
+    lambda show: (show.start_time, show.id),
+    show_item,
+    None
+)
+
+#----------------------------------------------------------------------------#
+# Details.
+#----------------------------------------------------------------------------#
+
+
+def entity_item(entity):
+    # Column values of a venue or artist, with genre names instead of codes
+    item = {column.name: getattr(entity, column.name)
+            for column in entity.__table__.columns
+            if column.name != 'genre_ids'}
+    item['genres'] = entity.genres
+    return item
+
+
+def split_shows(shows):
+    # Split show rows into upcoming and past shows
+    upcoming_shows = []
+    past_shows = []
+    now = datetime.now()
+
+    for show in shows:
+        (upcoming_shows if show.start_time > now else past_shows).append(dict(show._mapping))
+
+    return upcoming_shows, past_shows
+
+
+def venue_shows_select(venue_id):
+    # Shows of a venue with their artists, from one query
+    return db.select(
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Show.start_time
+    ).select_from(Show).join(Artist, Artist.id == Show.artist_id).where(
+        Show.venue_id == venue_id).order_by(Show.start_time)
+
+
+def venue_shows(venue_id):
+    # Upcoming and past shows of a venue
+    return split_shows(db.session.execute(venue_shows_select(venue_id)))
+
+
+def artist_shows_select(artist_id):
+    # Shows of an artist with their venues, from one query
+    return db.select(
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        Show.start_time
+    ).select_from(Show).join(Venue, Venue.id == Show.venue_id).where(
+        Show.artist_id == artist_id).order_by(Show.start_time)
+
+
+def artist_shows(artist_id):
+    # Upcoming and past shows of an artist
+    return split_shows(db.session.execute(artist_shows_select(artist_id)))